@@ -0,0 +1,99 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+
+# Pure magenta never occurs in the generated backgrounds, which is what the stub detector keys on
+WATERMARK_COLOR = (255, 0, 255)  # BGR
+
+
+def watermark_bbox(width, height):
+    """Known (x1, y1, x2, y2) of the overlaid watermark: a logo-sized box near the bottom right corner."""
+    return [int(width * 0.78), int(height * 0.9), int(width * 0.96), int(height * 0.95)]
+
+
+def synthetic_frame(width, height, t=0):
+    """Smooth colour gradient with a few moving shapes, so frames differ like real footage."""
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = (120 + 100 * np.sin(3 * x + t * 0.05) * np.cos(2 * y)).clip(0, 255)
+    frame[..., 1] = (110 + 90 * np.cos(4 * y + t * 0.03)).clip(0, 255)
+    frame[..., 2] = (90 + 60 * np.sin(5 * x * y + t * 0.07)).clip(0, 255)  # red stays below the detector threshold
+    for i in range(3):
+        cx = int((0.2 + 0.3 * i + 0.01 * t) % 1.0 * width)
+        cy = int((0.3 + 0.2 * i) * height)
+        cv2.circle(frame, (cx, cy), max(8, height // 12), (40 * i, 200 - 50 * i, 90), -1)
+    return frame
+
+
+def overlay_watermark(frame, bbox):
+    x1, y1, x2, y2 = bbox
+    cv2.rectangle(frame, (x1, y1), (x2, y2), WATERMARK_COLOR, -1)
+    scale = max(0.3, (y2 - y1) / 40)
+    cv2.putText(frame, "WATERMARK", (x1 + 4, y2 - 4), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 1, cv2.LINE_AA)
+    return frame
+
+
+def write_image(path, width, height):
+    bbox = watermark_bbox(width, height)
+    cv2.imwrite(str(path), overlay_watermark(synthetic_frame(width, height), bbox))
+    return bbox
+
+
+def write_video(path, width, height, frames, fps=24):
+    """Write a watermarked clip; with ffmpeg on PATH it also gets an AAC sine tone so muxing has work to do."""
+    bbox = watermark_bbox(width, height)
+    path = Path(path)
+    silent_path = path.with_name(f"{path.stem}_silent{path.suffix}")
+    writer = cv2.VideoWriter(str(silent_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for t in range(frames):
+        writer.write(overlay_watermark(synthetic_frame(width, height, t), bbox))
+    writer.release()
+
+    if shutil.which("ffmpeg") is None:
+        silent_path.replace(path)
+        return bbox
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", str(silent_path),
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={frames / fps}",
+            "-c:v", "copy", "-c:a", "aac", "-shortest", str(path),
+        ],
+        check=True,
+    )
+    silent_path.unlink()
+    return bbox
+
+
+def build_corpus(directory, resolutions, frames=48):
+    """
+    Generate one image and one video per resolution into `directory`.
+
+    Files that already exist are reused, so repeated runs time the same inputs.
+    Returns a list of {"name", "kind", "resolution", "path", "bbox", "frames"} dicts.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    corpus = []
+    for name in resolutions:
+        width, height = RESOLUTIONS[name]
+        image_path = directory / f"image_{name}.png"
+        video_path = directory / f"video_{name}_{frames}f.mp4"
+        bbox = watermark_bbox(width, height)
+        if not image_path.exists():
+            write_image(image_path, width, height)
+        if not video_path.exists():
+            write_video(video_path, width, height, frames)
+        corpus.append({"name": f"image_{name}", "kind": "image", "resolution": name, "path": image_path, "bbox": bbox, "frames": 1})
+        corpus.append({"name": f"video_{name}", "kind": "video", "resolution": name, "path": video_path, "bbox": bbox, "frames": frames})
+    return corpus
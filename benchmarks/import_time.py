@@ -0,0 +1,71 @@
+"""
+Import-time guard for the CLI.
+
+Starts fresh interpreters that import remwm_lama_florence2 and run `--help`, then
+checks that none of the heavy frameworks got imported on the way and that both
+stay within a time budget. Exits with status 1 on a regression.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget 0.5 --repeat 5
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Must only be imported once a stage actually needs them
+HEAVY_MODULES = ("torch", "transformers", "iopaint", "huggingface_hub", "cv2")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import remwm_lama_florence2
+elapsed = time.perf_counter() - start
+if {run_help}:
+    from click.testing import CliRunner
+    start = time.perf_counter()
+    result = CliRunner().invoke(remwm_lama_florence2.main, ["--help"])
+    elapsed += time.perf_counter() - start
+    assert result.exit_code == 0, result.output
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def probe(run_help):
+    """Import the CLI (and optionally render --help) in a new interpreter."""
+    code = _PROBE.format(run_help=run_help, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise click.ClickException(f"Probe failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+@click.command()
+@click.option("--budget", default=1.0, type=float, help="Maximum seconds for the import plus --help.")
+@click.option("--repeat", default=3, type=int, help="Fresh interpreters per probe; the fastest is reported.")
+def main(budget, repeat):
+    failures = []
+    for name, run_help in (("import", False), ("import + --help", True)):
+        runs = [probe(run_help) for _ in range(repeat)]
+        seconds = min(run["seconds"] for run in runs)
+        heavy = sorted({module for run in runs for module in run["heavy"]})
+        print(f"{name:16s} {seconds:6.3f}s  heavy modules loaded: {', '.join(heavy) or 'none'}")
+        if heavy:
+            failures.append(f"{name} imported {', '.join(heavy)}")
+        if seconds > budget:
+            failures.append(f"{name} took {seconds:.3f}s (budget {budget:.3f}s)")
+
+    if failures:
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        sys.exit(1)
+    print("Import time OK")
+
+
+if __name__ == "__main__":
+    main()
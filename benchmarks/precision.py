@@ -0,0 +1,156 @@
+"""
+Accuracy-vs-speed report for the Florence-2 --precision modes.
+
+Loads the real Florence-2 model once per precision (it is downloaded on first use)
+and runs detection on the synthetic benchmark corpus, whose watermark position is
+known. For every precision it reports the detection latency per image, the share
+of watermarks found (best box IoU >= --min-iou) and the mean IoU, and recommends
+the fastest precision that finds as many watermarks as fp32.
+
+    python -m benchmarks.precision
+    python -m benchmarks.precision --precisions fp32,int8 --resolutions 720p --output precision.json
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+import click
+import cv2
+from loguru import logger
+from PIL import Image
+
+import remwm_lama_florence2 as remwm
+from benchmarks.corpus import RESOLUTIONS, build_corpus
+from src.metrics import peak_rss_bytes
+from src.precision import PRECISIONS
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def corpus_samples(corpus, frames_per_video):
+    """(name, PIL image, known bbox) for every corpus image and a few frames spread over every video."""
+    samples = []
+    for item in corpus:
+        if item["kind"] == "image":
+            samples.append((item["name"], Image.open(item["path"]).convert("RGB"), item["bbox"]))
+            continue
+        cap = cv2.VideoCapture(str(item["path"]))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        count = max(1, min(frames_per_video, total))
+        for index in sorted({int(i * total / count) for i in range(count)}):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = cap.read()
+            if ret:
+                samples.append((f"{item['name']}#{index}", Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), item["bbox"]))
+        cap.release()
+    return samples
+
+
+def evaluate(precision, device, samples, detection_prompt, max_bbox_percent, min_iou):
+    start = time.perf_counter()
+    model, processor = remwm.load_florence_model(device, precision)
+    load_seconds = time.perf_counter() - start
+
+    # One warm-up call so lazy initialisation is not charged to the first sample
+    remwm.detect_only(samples[0][1], model, processor, device, max_bbox_percent, detection_prompt)
+
+    seconds, ious, per_sample = [], [], {}
+    for name, image, bbox in samples:
+        start = time.perf_counter()
+        detections = remwm.detect_only(image, model, processor, device, max_bbox_percent, detection_prompt)
+        elapsed = time.perf_counter() - start
+        best = max((iou(det["bbox"], bbox) for det in detections if det["accepted"]), default=0.0)
+        seconds.append(elapsed)
+        ious.append(best)
+        per_sample[name] = {"seconds": round(elapsed, 4), "iou": round(best, 4)}
+
+    return {
+        "precision": remwm.model_precision(model),
+        "load_seconds": round(load_seconds, 3),
+        "seconds_per_image": sum(seconds) / len(seconds),
+        "found": sum(1 for value in ious if value >= min_iou) / len(ious),
+        "mean_iou": sum(ious) / len(ious),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "samples": per_sample,
+    }
+
+
+def recommend(results):
+    """Fastest precision that finds at least as many watermarks as fp32 (or as the best one without fp32)."""
+    reference = results["fp32"]["found"] if "fp32" in results else max(result["found"] for result in results.values())
+    candidates = [name for name, result in results.items() if result["found"] >= reference]
+    return min(candidates, key=lambda name: results[name]["seconds_per_image"])
+
+
+@click.command()
+@click.option("--precisions", default=",".join(PRECISIONS), help=f"Comma-separated subset of {', '.join(PRECISIONS)}.")
+@click.option("--resolutions", default="480p,720p,1080p", help=f"Comma-separated subset of {', '.join(RESOLUTIONS)}.")
+@click.option("--frames", default=48, type=int, help="Frames per synthetic video.")
+@click.option("--frames-per-video", default=4, type=int, help="Video frames evaluated per clip, spread evenly.")
+@click.option("--corpus-dir", type=click.Path(), default=None, help="Where the synthetic corpus is generated and reused (default: a temp dir).")
+@click.option("--device", default="cpu", help="Torch device the model runs on.")
+@click.option("--detection-prompt", default="watermark")
+@click.option("--max-bbox-percent", default=10.0, type=float)
+@click.option("--min-iou", default=0.5, type=float, help="IoU with the known watermark box above which it counts as found.")
+@click.option("--output", type=click.Path(), default=None, help="Write the JSON report here.")
+def main(precisions, resolutions, frames, frames_per_video, corpus_dir, device, detection_prompt, max_bbox_percent, min_iou, output):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    precisions = [name.strip() for name in precisions.split(",") if name.strip()]
+    unknown = [name for name in precisions if name not in PRECISIONS]
+    if unknown:
+        raise click.BadParameter(f"Unknown precision(s): {', '.join(unknown)}", param_hint="--precisions")
+    resolutions = [name.strip() for name in resolutions.split(",") if name.strip()]
+    unknown = [name for name in resolutions if name not in RESOLUTIONS]
+    if unknown:
+        raise click.BadParameter(f"Unknown resolution(s): {', '.join(unknown)}", param_hint="--resolutions")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = build_corpus(corpus_dir or Path(temp_dir) / "corpus", resolutions, frames)
+        samples = corpus_samples(corpus, frames_per_video)
+
+    results = {}
+    for precision in precisions:
+        results[precision] = evaluate(precision, device, samples, detection_prompt, max_bbox_percent, min_iou)
+
+    baseline = results.get("fp32")
+    print(f"{'precision':10s} {'s/image':>8s} {'speedup':>8s} {'found':>6s} {'mean IoU':>9s} {'load s':>7s}")
+    for precision, result in results.items():
+        speedup = baseline["seconds_per_image"] / result["seconds_per_image"] if baseline else 1.0
+        print(f"{precision:10s} {result['seconds_per_image']:8.3f} {speedup:7.2f}x {result['found']:6.0%} {result['mean_iou']:9.3f} {result['load_seconds']:7.1f}")
+    best = recommend(results)
+    print(f"Recommended: --precision {best}")
+
+    if output:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "device": device,
+                "samples": len(samples),
+                "detection_prompt": detection_prompt,
+                "min_iou": min_iou,
+            },
+            "results": results,
+            "recommended": best,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
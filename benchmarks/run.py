@@ -0,0 +1,157 @@
+"""
+Stage-level benchmark of handle_one, process_video and process_video_two_pass.
+
+Runs offline on a synthetic corpus with stub Florence-2/LaMa backends and writes
+per-stage timings (decode, detect, mask, inpaint, encode, mux) as JSON. With a
+baseline file, every run is compared against it and regressions are listed.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --fail-on-regression
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+import click
+import cv2
+from loguru import logger
+
+import remwm_lama_florence2 as remwm
+from benchmarks.corpus import RESOLUTIONS, build_corpus
+from benchmarks.stubs import StubFlorenceModel, StubFlorenceProcessor, StubModelManager
+from src.ffmpeg_writer import ffmpeg_available
+from src.profiling import stage_timer
+
+STAGES = ("decode", "detect", "mask", "inpaint", "encode", "mux")
+
+# Differences below this many seconds are noise, whatever the ratio
+NOISE_FLOOR = 0.02
+
+
+def run_scenario(scenario, item, output_dir, backends, options):
+    florence_model, florence_processor, model_manager = backends
+    output_path = Path(output_dir) / f"{scenario}_{item['name']}{item['path'].suffix}"
+    if scenario == "handle_one":
+        remwm.handle_one(item["path"], output_path, florence_model, florence_processor, model_manager, "cpu", False, options["max_bbox_percent"], None, True, detection_batch_size=options["detection_batch_size"])
+    elif scenario == "process_video":
+        remwm.process_video(item["path"], output_path, florence_model, florence_processor, model_manager, "cpu", False, options["max_bbox_percent"], None, detection_batch_size=options["detection_batch_size"])
+    else:
+        remwm.process_video_two_pass(item["path"], output_path, florence_model, florence_processor, model_manager, "cpu", False, options["max_bbox_percent"], None, detection_skip=options["detection_skip"], detection_batch_size=options["detection_batch_size"])
+
+
+def benchmark(corpus, output_dir, backends, options, repeat=1, verbose=False):
+    results = {}
+    for item in corpus:
+        scenarios = ["handle_one"] if item["kind"] == "image" else ["process_video", "process_video_two_pass"]
+        for scenario in scenarios:
+            key = f"{scenario}/{item['resolution']}"
+            best = None
+            for _ in range(repeat):
+                stage_timer.reset()
+                start = time.perf_counter()
+                # The processing functions print progress lines for the GUI
+                with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+                    run_scenario(scenario, item, output_dir, backends, options)
+                wall = time.perf_counter() - start
+                if best is None or wall < best["wall_seconds"]:
+                    best = {"wall_seconds": wall, "stages": stage_timer.snapshot()}
+            best["frames"] = item["frames"]
+            best["fps"] = item["frames"] / best["wall_seconds"] if best["wall_seconds"] else 0.0
+            results[key] = best
+            print(f"{key:36s} {best['wall_seconds']:8.3f}s  " + "  ".join(
+                f"{stage}={best['stages'][stage]['seconds']:.3f}" for stage in STAGES if stage in best["stages"]
+            ))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        pairs = [("wall", current["wall_seconds"], previous["wall_seconds"])]
+        for stage in STAGES:
+            if stage in current["stages"] and stage in previous["stages"]:
+                pairs.append((stage, current["stages"][stage]["seconds"], previous["stages"][stage]["seconds"]))
+        for name, now, before in pairs:
+            if now - before > NOISE_FLOOR and now > before * (1 + tolerance):
+                regressions.append(f"{key} {name}: {before:.3f}s -> {now:.3f}s ({now / before - 1:+.0%})")
+    return regressions
+
+
+@click.command()
+@click.option("--output", type=click.Path(), default=None, help="Write the JSON results here.")
+@click.option("--baseline", type=click.Path(exists=True), default=None, help="Earlier --output file to compare against.")
+@click.option("--tolerance", default=0.15, type=float, help="Allowed slowdown against the baseline (0.15 = 15%).")
+@click.option("--fail-on-regression", is_flag=True, help="Exit with status 1 if anything regressed beyond --tolerance.")
+@click.option("--resolutions", default="480p,720p,1080p", help=f"Comma-separated subset of {', '.join(RESOLUTIONS)}.")
+@click.option("--frames", default=48, type=int, help="Frames per synthetic video.")
+@click.option("--repeat", default=1, type=int, help="Runs per scenario; the fastest one is reported.")
+@click.option("--corpus-dir", type=click.Path(), default=None, help="Where the synthetic corpus is generated and reused (default: a temp dir).")
+@click.option("--detection-skip", default=5, type=int, help="detection_skip used for process_video_two_pass.")
+@click.option("--detection-batch-size", default=1, type=int)
+@click.option("--florence-latency", default=0.0, type=float, help="Seconds the stub Florence-2 sleeps per image.")
+@click.option("--lama-latency", default=0.0, type=float, help="Seconds the stub LaMa sleeps per call.")
+@click.option("--verbose", is_flag=True, help="Keep the progress output and info logs of the processing code.")
+def main(output, baseline, tolerance, fail_on_regression, resolutions, frames, repeat, corpus_dir, detection_skip, detection_batch_size, florence_latency, lama_latency, verbose):
+    if not verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+    resolutions = [name.strip() for name in resolutions.split(",") if name.strip()]
+    unknown = [name for name in resolutions if name not in RESOLUTIONS]
+    if unknown:
+        raise click.BadParameter(f"Unknown resolution(s): {', '.join(unknown)}", param_hint="--resolutions")
+
+    backends = (StubFlorenceModel(florence_latency), StubFlorenceProcessor(), StubModelManager(lama_latency))
+    options = {"max_bbox_percent": 10.0, "detection_skip": detection_skip, "detection_batch_size": detection_batch_size}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = build_corpus(corpus_dir or Path(temp_dir) / "corpus", resolutions, frames)
+        output_dir = Path(temp_dir) / "output"
+        output_dir.mkdir()
+        results = benchmark(corpus, output_dir, backends, options, repeat, verbose)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "ffmpeg": ffmpeg_available(),
+            "frames": frames,
+            "options": options,
+            "florence_latency": florence_latency,
+            "lama_latency": lama_latency,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {output}")
+
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            if fail_on_regression:
+                sys.exit(1)
+        else:
+            print(f"No regressions against {baseline} (tolerance {tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Offline stand-ins for Florence-2 and LaMa.
+
+They plug into the real code paths (identify_batch(), process_image_with_lama())
+so everything around the models is timed as in production. Detection finds the
+magenta watermark of the synthetic corpus; inpainting is OpenCV's Telea.
+"""
+import json
+import time
+
+import cv2
+import numpy as np
+
+
+def find_watermark(rgb):
+    """Bbox of the magenta watermark in an RGB image, or None. Tolerant of codec noise."""
+    r, g, b = (rgb[..., c].astype(np.int16) for c in range(3))
+    ys, xs = np.nonzero((r > 180) & (b > 180) & (g < 90))
+    if len(xs) == 0:
+        return None
+    return [int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1]
+
+
+class _Batch:
+    """Tensor stand-in: only .to(device) is used by identify_batch()."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def to(self, device):
+        return self
+
+
+class StubFlorenceProcessor:
+    def __call__(self, text, images, return_tensors=None):
+        return {"input_ids": _Batch(text), "pixel_values": _Batch([np.asarray(image) for image in images])}
+
+    def batch_decode(self, generated, skip_special_tokens=False):
+        return [json.dumps(bboxes) for bboxes in generated]
+
+    def post_process_generation(self, text, task, image_size):
+        bboxes = json.loads(text)
+        return {task: {"bboxes": bboxes, "bboxes_labels": ["watermark"] * len(bboxes)}}
+
+
+class StubFlorenceModel:
+    """`seconds_per_image` emulates model latency; 0 times only the code around the model."""
+
+    def __init__(self, seconds_per_image=0.0):
+        self.seconds_per_image = seconds_per_image
+
+    def generate(self, input_ids, pixel_values, **kwargs):
+        if self.seconds_per_image:
+            time.sleep(self.seconds_per_image * len(pixel_values.items))
+        results = []
+        for rgb in pixel_values.items:
+            bbox = find_watermark(rgb)
+            results.append([bbox] if bbox else [])
+        return results
+
+
+class StubModelManager:
+    """ModelManager stand-in with LaMa's contract: RGB in, BGR out."""
+
+    def __init__(self, seconds_per_call=0.0):
+        self.seconds_per_call = seconds_per_call
+
+    def __call__(self, image, mask, config):
+        if self.seconds_per_call:
+            time.sleep(self.seconds_per_call)
+        mask = (mask > 0).astype(np.uint8) * 255
+        if mask.ndim == 3:
+            mask = mask[..., 0]
+        return cv2.inpaint(cv2.cvtColor(image, cv2.COLOR_RGB2BGR), mask, 3, cv2.INPAINT_TELEA)
@@ -1,32 +1,48 @@
+from __future__ import annotations
+
 import sys
 import click
 from pathlib import Path
-import cv2
+from typing import TYPE_CHECKING
 import numpy as np
 from PIL import Image, ImageDraw
 
-# Monkey-patch: cached_download was removed in huggingface_hub 0.24, add compatibility shim
-import huggingface_hub
-if not hasattr(huggingface_hub, 'cached_download'):
-    huggingface_hub.cached_download = huggingface_hub.hf_hub_download
+# torch, transformers, iopaint and huggingface_hub are imported where the models are
+# loaded, and cv2 on first use, so --help, argument errors and skipped files start fast
+from src.lazy import lazy_module
+cv2 = lazy_module("cv2")
 
-from transformers import AutoProcessor, AutoModelForCausalLM
-from iopaint.model_manager import ModelManager
-from iopaint.schema import HDStrategy, LDMSampler, InpaintRequest as Config
-import torch
-from torch.nn import Module
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
+    from transformers import AutoProcessor
+    from iopaint.model_manager import ModelManager
 import tqdm
 from loguru import logger
 from enum import Enum
-import os
-import tempfile
-import shutil
 import subprocess
-
-try:
-    from cv2.typing import MatLike
-except ImportError:
-    MatLike = np.ndarray
+import re
+import queue
+import threading
+import multiprocessing
+from collections import deque
+
+from src.compositing import make_transparent_rgba, fill_masked_region
+from src import model_server
+from src.video_pipeline import FramePipeline, PipelineStage
+from src.detection_cache import DetectionCache, DEFAULT_CACHE_SIZE_MB
+from src.detection_frontend import DetectionFrontEnd, DEFAULT_TILE_MIN_SIDE
+from src.roi import mask_regions
+from src.hd_strategy import HD_STRATEGIES, LamaConfig
+from src.lama_batch import LamaBatcher
+from src.inpaint_engine import INPAINT_ENGINES, InpaintEngine
+from src.dedup import FrameDeduplicator, PatchReuser
+from src.tracking import BBoxTracker
+from src.discovery import DirectoryScan, iter_files
+from src.manifest import Manifest
+from src.profiling import stage_timer
+from src.precision import PRECISIONS, apply_precision, inference_precision, model_precision
+from src.metrics import metrics, METRICS_FILE_ENV
+from src.ffmpeg_writer import FFmpegVideoWriter, DEFAULT_CODECS, ffmpeg_available
 
 
 def download_lama_model():
@@ -49,8 +65,17 @@ def download_lama_model():
     return True
 
 
+def patch_huggingface_hub():
+    # Monkey-patch: cached_download was removed in huggingface_hub 0.24, add compatibility shim
+    import huggingface_hub
+    if not hasattr(huggingface_hub, 'cached_download'):
+        huggingface_hub.cached_download = huggingface_hub.hf_hub_download
+
+
 def load_lama_model(device):
     """Load LaMA model, downloading if necessary."""
+    patch_huggingface_hub()
+    from iopaint.model_manager import ModelManager
     try:
         return ModelManager(name="lama", device=device)
     except NotImplementedError as e:
@@ -67,31 +92,164 @@ def load_lama_model(device):
                 raise RuntimeError("Failed to download LaMA model. Please run manually: python\\python.exe -m iopaint download --model lama")
         raise
 
+FLORENCE_MODEL_ID = "microsoft/Florence-2-large"
+
+
+def detection_model_id(precision="fp32"):
+    """Model id used for detection cache keys and the manifest; reduced precision can detect differently."""
+    return FLORENCE_MODEL_ID if precision == "fp32" else f"{FLORENCE_MODEL_ID}@{precision}"
+
+# handle_one options that change the output; --incremental reprocesses a file when any of them differ
+OUTPUT_OPTIONS = (
+    "transparent", "max_bbox_percent", "force_format", "detection_prompt", "detection_skip", "fade_in", "fade_out",
+    "roi_padding", "roi_union", "track", "track_threshold", "track_margin",
+    "static_watermark", "static_samples", "static_vote", "encoder_options", "dedup_threshold", "patch_threshold",
+    "detection_frontend", "lama_config", "inpaint_engine",
+    # The batched LaMa path pads and crops on its own, so its pixels can differ from iopaint's
+    "lama_batch_size",
+)
+
 class TaskType(str, Enum):
     OPEN_VOCAB_DETECTION = "<OPEN_VOCABULARY_DETECTION>"
     """Detect bounding box for objects and OCR text"""
 
-def identify(task_prompt: TaskType, image: MatLike, text_input: str, model, processor: AutoProcessor, device: str):
+def identify_batch(task_prompt: TaskType, images: list, text_input: str, model, processor: AutoProcessor, device: str):
+    """
+    Run a single Florence-2 generate call over several images sharing one prompt.
+
+    The processor stacks the images into one pixel_values tensor, so the per-call
+    overhead of generate() is paid once per batch instead of once per image.
+
+    Returns:
+        list of parsed answers, one per input image, in input order
+    """
     if not isinstance(task_prompt, TaskType):
         raise ValueError(f"task_prompt must be a TaskType, but {task_prompt} is of type {type(task_prompt)}")
+    if not images:
+        return []
 
     prompt = task_prompt.value if text_input is None else task_prompt.value + text_input
-    inputs = processor(text=prompt, images=image, return_tensors="pt")
+    inputs = processor(text=[prompt] * len(images), images=images, return_tensors="pt")
     inputs = {k: v.to(device) for k, v in inputs.items()}
 
-    generated_ids = model.generate(
-        input_ids=inputs["input_ids"],
-        pixel_values=inputs["pixel_values"],
-        max_new_tokens=1024,
-        do_sample=False,
-        num_beams=1,
-    )
-    generated_text = processor.batch_decode(generated_ids, skip_special_tokens=False)[0]
-    return processor.post_process_generation(
-        generated_text, task=task_prompt.value, image_size=(image.width, image.height)
-    )
+    with inference_precision(model, device):
+        generated_ids = model.generate(
+            input_ids=inputs["input_ids"],
+            pixel_values=inputs["pixel_values"],
+            max_new_tokens=1024,
+            do_sample=False,
+            num_beams=1,
+        )
+    generated_texts = processor.batch_decode(generated_ids, skip_special_tokens=False)
+
+    parsed_answers = []
+    for generated_text, image in zip(generated_texts, images):
+        # Shorter sequences in a batch are right-padded after </s>
+        generated_text = generated_text.replace("<pad>", "")
+        parsed_answers.append(processor.post_process_generation(
+            generated_text, task=task_prompt.value, image_size=(image.width, image.height)
+        ))
+    return parsed_answers
+
+def identify(task_prompt: TaskType, image: MatLike, text_input: str, model, processor: AutoProcessor, device: str):
+    return identify_batch(task_prompt, [image], text_input, model, processor, device)[0]
+
+def raw_bboxes(parsed_answer: dict):
+    """Extract the integer bboxes from a parsed Florence-2 answer, before any filtering."""
+    detection_key = "<OPEN_VOCABULARY_DETECTION>"
+    if detection_key in parsed_answer and "bboxes" in parsed_answer[detection_key]:
+        return [list(map(int, bbox)) for bbox in parsed_answer[detection_key]["bboxes"]]
+    return []
+
+def filter_bboxes(bboxes: list, image_size: tuple, max_bbox_percent: float):
+    """
+    Flag raw bboxes by the max_bbox_percent limit.
+
+    Returns:
+        list of dicts with bbox info: [{"bbox": [x1,y1,x2,y2], "area_percent": float, "accepted": bool}, ...]
+    """
+    results = []
+    image_area = image_size[0] * image_size[1]
+    for x1, y1, x2, y2 in bboxes:
+        bbox_area = (x2 - x1) * (y2 - y1)
+        area_percent = (bbox_area / image_area) * 100
+        accepted = area_percent <= max_bbox_percent
+
+        results.append({
+            "bbox": [x1, y1, x2, y2],
+            "area_percent": round(area_percent, 2),
+            "accepted": accepted
+        })
+
+    return results
+
+def detect_raw_batch(images: list, model, processor: AutoProcessor, device: str, detection_prompt: str = "watermark", detection_cache: DetectionCache = None, detection_frontend: DetectionFrontEnd = None):
+    """
+    Return the unfiltered bboxes for each image, consulting `detection_cache` first.
+
+    Only cache misses are sent to Florence-2, still as a single batch. With a
+    `detection_frontend`, Florence-2 sees its downscaled/tiled views instead and
+    the bboxes are mapped back to the original image coordinates.
+    """
+    results = [None] * len(images)
+    keys = [None] * len(images)
+    if detection_cache is not None:
+        model_id = detection_model_id(model_precision(model))
+        if detection_frontend is not None:
+            model_id = f"{model_id}|{detection_frontend.signature}"
+        for i, image in enumerate(images):
+            keys[i] = detection_cache.key(image, detection_prompt, model_id)
+            results[i] = detection_cache.get(keys[i])
+
+    missing = [i for i, bboxes in enumerate(results) if bboxes is None]
+    if missing and detection_frontend is None:
+        task_prompt = TaskType.OPEN_VOCAB_DETECTION
+        with stage_timer.stage("detect"):
+            parsed_answers = identify_batch(task_prompt, [images[i] for i in missing], detection_prompt, model, processor, device)
+        for i, parsed_answer in zip(missing, parsed_answers):
+            results[i] = raw_bboxes(parsed_answer)
+    elif missing:
+        with stage_timer.stage("detect"):
+            views = [(i, view, transform) for i in missing for view, transform in detection_frontend.views(images[i])]
+            view_bboxes = []
+            # Tiles multiply the images per image; keep each generate call at the size of the incoming batch
+            for chunk in batched(views, len(missing)):
+                parsed_answers = identify_batch(TaskType.OPEN_VOCAB_DETECTION, [view for _, view, _ in chunk], detection_prompt, model, processor, device)
+                view_bboxes.extend(raw_bboxes(parsed_answer) for parsed_answer in parsed_answers)
+        for i in missing:
+            own = [(bboxes, transform) for (index, _, transform), bboxes in zip(views, view_bboxes) if index == i]
+            results[i] = detection_frontend.merge([bboxes for bboxes, _ in own], [transform for _, transform in own], images[i].size)
+    if detection_cache is not None:
+        for i in missing:
+            detection_cache.put(keys[i], results[i])
 
-def get_watermark_mask(image: MatLike, model, processor: AutoProcessor, device: str, max_bbox_percent: float, detection_prompt: str = "watermark"):
+    return results
+
+def detect_batch(images: list, model, processor: AutoProcessor, device: str, max_bbox_percent: float, detection_prompt: str = "watermark", detection_cache: DetectionCache = None, detection_frontend: DetectionFrontEnd = None):
+    """
+    Batched counterpart of detect_only(): one generate call for all images.
+
+    Returns:
+        list with one detect_only() style result list per input image
+    """
+    all_bboxes = detect_raw_batch(images, model, processor, device, detection_prompt, detection_cache, detection_frontend)
+    return [filter_bboxes(bboxes, image.size, max_bbox_percent) for bboxes, image in zip(all_bboxes, images)]
+
+def mask_from_detections(image_size: tuple, detections: list):
+    """Rasterize the accepted bboxes of a detect_only() result into an "L" mask."""
+    with stage_timer.stage("mask"):
+        mask = Image.new("L", image_size, 0)
+        draw = ImageDraw.Draw(mask)
+
+        for det in detections:
+            if det["accepted"]:
+                draw.rectangle(det["bbox"], fill=255)
+            else:
+                logger.warning(f"Skipping large bounding box: {det['bbox']} covering {det['area_percent']:.2f}% of the image")
+
+    return mask
+
+def get_watermark_mask(image: MatLike, model, processor: AutoProcessor, device: str, max_bbox_percent: float, detection_prompt: str = "watermark", detection_cache: DetectionCache = None, detection_frontend: DetectionFrontEnd = None):
     """
     Detect watermarks and create a mask for inpainting.
 
@@ -102,29 +260,21 @@ def get_watermark_mask(image: MatLike, model, processor: AutoProcessor, device:
         device: cuda or cpu
         max_bbox_percent: Maximum bbox size as percentage of image
         detection_prompt: Text prompt for detection (e.g. "watermark", "watermark Sora logo", "Getty Images")
+        detection_cache: Optional DetectionCache consulted before running Florence-2
+        detection_frontend: Optional DetectionFrontEnd that downscales/tiles the image for Florence-2
     """
     print("get_watermark_mask=======================>", image, model, processor, device, max_bbox_percent, detection_prompt)
-    task_prompt = TaskType.OPEN_VOCAB_DETECTION
-    parsed_answer = identify(task_prompt, image, detection_prompt, model, processor, device)
+    detections = detect_only(image, model, processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)
+    return mask_from_detections(image.size, detections)
 
-    mask = Image.new("L", image.size, 0)
-    draw = ImageDraw.Draw(mask)
 
-    detection_key = "<OPEN_VOCABULARY_DETECTION>"
-    if detection_key in parsed_answer and "bboxes" in parsed_answer[detection_key]:
-        image_area = image.width * image.height
-        for bbox in parsed_answer[detection_key]["bboxes"]:
-            x1, y1, x2, y2 = map(int, bbox)
-            bbox_area = (x2 - x1) * (y2 - y1)
-            if (bbox_area / image_area) * 100 <= max_bbox_percent:
-                draw.rectangle([x1, y1, x2, y2], fill=255)
-            else:
-                logger.warning(f"Skipping large bounding box: {bbox} covering {bbox_area / image_area:.2%} of the image")
-
-    return mask
+def get_watermark_masks(images: list, model, processor: AutoProcessor, device: str, max_bbox_percent: float, detection_prompt: str = "watermark", detection_cache: DetectionCache = None, detection_frontend: DetectionFrontEnd = None):
+    """Batched counterpart of get_watermark_mask(): returns one mask per input image."""
+    all_detections = detect_batch(images, model, processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)
+    return [mask_from_detections(image.size, detections) for image, detections in zip(images, all_detections)]
 
 
-def detect_only(image: MatLike, model, processor: AutoProcessor, device: str, max_bbox_percent: float, detection_prompt: str = "watermark"):
+def detect_only(image: MatLike, model, processor: AutoProcessor, device: str, max_bbox_percent: float, detection_prompt: str = "watermark", detection_cache: DetectionCache = None, detection_frontend: DetectionFrontEnd = None):
     """
     Detect watermarks and return bounding boxes WITHOUT creating mask or inpainting.
     Used for preview mode to show what would be detected.
@@ -132,62 +282,362 @@ def detect_only(image: MatLike, model, processor: AutoProcessor, device: str, ma
     Returns:
         list of dicts with bbox info: [{"bbox": [x1,y1,x2,y2], "area_percent": float, "accepted": bool}, ...]
     """
-    task_prompt = TaskType.OPEN_VOCAB_DETECTION
-    parsed_answer = identify(task_prompt, image, detection_prompt, model, processor, device)
+    return detect_batch([image], model, processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)[0]
 
-    results = []
-    detection_key = "<OPEN_VOCABULARY_DETECTION>"
+# Used when a job does not configure the HD strategy (crop, 64 px margin, 800 px trigger, 1600 px limit)
+DEFAULT_LAMA_CONFIG = LamaConfig()
 
-    if detection_key in parsed_answer and "bboxes" in parsed_answer[detection_key]:
-        image_area = image.width * image.height
-        for bbox in parsed_answer[detection_key]["bboxes"]:
-            x1, y1, x2, y2 = map(int, bbox)
-            bbox_area = (x2 - x1) * (y2 - y1)
-            area_percent = (bbox_area / image_area) * 100
-            accepted = area_percent <= max_bbox_percent
-
-            results.append({
-                "bbox": [x1, y1, x2, y2],
-                "area_percent": round(area_percent, 2),
-                "accepted": accepted
-            })
-
-    return results
-
-def process_image_with_lama(image: MatLike, mask: MatLike, model_manager: ModelManager):
-    config = Config(
-        ldm_steps=50,
-        ldm_sampler=LDMSampler.ddim,
-        hd_strategy=HDStrategy.CROP,
-        hd_strategy_crop_margin=64,
-        hd_strategy_crop_trigger_size=800,
-        hd_strategy_resize_limit=1600,
-    )
-    result = model_manager(image, mask, config)
+def process_image_with_lama(image: MatLike, mask: MatLike, model_manager: ModelManager, lama_config: LamaConfig = None, count: bool = True):
+    config = (lama_config or DEFAULT_LAMA_CONFIG).request(image, mask, count)
+    with stage_timer.stage("inpaint"):
+        result = model_manager(image, mask, config)
 
     if result.dtype in [np.float64, np.float32]:
         result = np.clip(result, 0, 255).astype(np.uint8)
 
     return result
 
+def process_image_with_lama_roi(image: MatLike, mask: MatLike, model_manager: ModelManager, padding: int = 64, union: bool = False, lama_config: LamaConfig = None):
+    """
+    Inpaint only padded windows around the mask regions and paste them back.
+
+    Same contract as process_image_with_lama() (RGB in, BGR out), but LaMa only
+    sees the crops. Returns (result, processed_pixels).
+    """
+    result = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    processed_pixels = 0
+    for x1, y1, x2, y2 in mask_regions(mask, padding, union):
+        crop = np.ascontiguousarray(image[y1:y2, x1:x2])
+        crop_mask = np.ascontiguousarray(mask[y1:y2, x1:x2])
+        result[y1:y2, x1:x2] = process_image_with_lama(crop, crop_mask, model_manager, lama_config)
+        processed_pixels += (x2 - x1) * (y2 - y1)
+    return result, processed_pixels
+
+def inpaint_with_lama(image: MatLike, mask: MatLike, model_manager: ModelManager, roi_padding: int = None, roi_union: bool = False, stats: dict = None, lama_config: LamaConfig = None, inpaint_engine: InpaintEngine = None):
+    """
+    Run LaMa on the full frame, or only on mask ROIs when `roi_padding` is set.
+
+    `stats`, if given, accumulates "processed_pixels" and "total_pixels" so callers
+    can report how much of the frame LaMa actually had to look at. With an
+    `inpaint_engine`, the regions it assigns to Telea/NS are inpainted by OpenCV
+    instead, and LaMa is skipped when no region is left for it.
+    """
+    classical = {}
+    if inpaint_engine is not None:
+        mask, classical = inpaint_engine.split(image, mask)
+
+    total_pixels = image.shape[0] * image.shape[1]
+    if inpaint_engine is not None and not mask.any():
+        result = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        processed_pixels = 0
+    elif roi_padding is None:
+        result = process_image_with_lama(image, mask, model_manager, lama_config)
+        processed_pixels = total_pixels
+    else:
+        result, processed_pixels = process_image_with_lama_roi(image, mask, model_manager, roi_padding, roi_union, lama_config)
+
+    if stats is not None:
+        stats["processed_pixels"] = stats.get("processed_pixels", 0) + processed_pixels
+        stats["total_pixels"] = stats.get("total_pixels", 0) + total_pixels
+    if classical:
+        result = inpaint_engine.inpaint_classical(result, classical)
+    return result
+
+def log_roi_stats(stats: dict):
+    if stats.get("total_pixels"):
+        share = stats["processed_pixels"] / stats["total_pixels"]
+        logger.info(f"ROI inpainting: LaMa processed {stats['processed_pixels']} of {stats['total_pixels']} pixels ({share:.1%})")
+
+def is_duplicate_masked_frame(dedup, frame, bboxes):
+    """
+    --dedup check for pass 2, where only frames that get bboxes are deduplicated.
+
+    A frame without bboxes is written unmasked, so it ends the run: the next
+    masked frame must not reuse an output from before it.
+    """
+    if dedup is None:
+        return False
+    if not bboxes:
+        dedup.reset()
+        return False
+    return dedup.is_duplicate(frame, bboxes)
+
+
+def log_dedup_stats(dedup: FrameDeduplicator):
+    logger.info(f"Frame dedup: reused the previous output for {dedup.duplicates} of {dedup.frames} frames ({dedup.hit_rate:.1%} hit rate)")
+
+def inpaint_frame_with_lama(frame, mask, model_manager, roi_padding=None, roi_union=False, roi_stats=None, patches=None, frame_rgb=None, lama_config=None, inpaint_engine=None):
+    """
+    Inpaint a BGR video frame, reusing the previous frame's patch when `patches`
+    (a PatchReuser) finds the mask and its neighbourhood unchanged. Returns BGR.
+    """
+    if patches is not None:
+        result = patches.reuse(frame, mask)
+        if result is not None:
+            return result
+    if frame_rgb is None:
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    result = inpaint_with_lama(frame_rgb, mask, model_manager, roi_padding, roi_union, roi_stats, lama_config, inpaint_engine)
+    if patches is not None:
+        patches.store(frame, mask, result)
+    return result
+
+def lama_windows(image, mask, roi_padding=None, roi_union=False, lama_config=None):
+    """
+    Crop windows a LamaBatcher can inpaint for this frame in place of iopaint, or None.
+
+    These are the regions iopaint would run the network on: the ROI windows in
+    --roi mode, the whole frame when it is within the crop trigger, otherwise the
+    crop strategy's padded mask regions. Frames that need iopaint's resizing, or
+    windows larger than the crop trigger, return None and go through the ModelManager.
+    """
+    config = lama_config or DEFAULT_LAMA_CONFIG
+    height, width = image.shape[:2]
+    if roi_padding is not None:
+        windows = mask_regions(mask, roi_padding, roi_union)
+    elif max(height, width) <= config.crop_trigger:
+        windows = [(0, 0, width, height)]
+    elif config.select(image, mask) == "crop":
+        windows = mask_regions(mask, config.crop_margin)
+    else:
+        return None
+    if any(max(x2 - x1, y2 - y1) > config.crop_trigger for x1, y1, x2, y2 in windows):
+        return None
+    # Counted like request() would on the per-frame path: per ROI crop, otherwise per frame
+    if roi_padding is not None:
+        for x1, y1, x2, y2 in windows:
+            config.record(image[y1:y2, x1:x2], mask[y1:y2, x1:x2])
+    else:
+        config.record(image, mask)
+    return windows
+
+def inpaint_frames_with_lama(frames, masks, model_manager, roi_padding=None, roi_union=False, roi_stats=None, patches=None, frames_rgb=None, lama_config=None, batcher=None, inpaint_engine=None):
+    """
+    Batched counterpart of inpaint_frame_with_lama() for consecutive BGR frames.
+
+    With a `batcher` (LamaBatcher), the LaMa crops of all frames go through it
+    together and are pasted back into copies of their frames. Patch reuse compares
+    against the last frame inpainted before this batch. Returns BGR results in order.
+    """
+    if frames_rgb is None:
+        frames_rgb = [None] * len(frames)
+    if batcher is None:
+        return [
+            inpaint_frame_with_lama(frame, mask, model_manager, roi_padding, roi_union, roi_stats, patches, frame_rgb, lama_config, inpaint_engine)
+            for frame, mask, frame_rgb in zip(frames, masks, frames_rgb)
+        ]
+
+    results = [None] * len(frames)
+    inpainted = []
+    classical = {}
+    crops, owners = [], []
+    for i, (frame, mask, frame_rgb) in enumerate(zip(frames, masks, frames_rgb)):
+        if patches is not None:
+            results[i] = patches.reuse(frame, mask)
+            if results[i] is not None:
+                continue
+        inpainted.append(i)
+        if frame_rgb is None:
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        lama_mask = mask
+        if inpaint_engine is not None:
+            lama_mask, classical[i] = inpaint_engine.split(frame_rgb, mask)
+        if inpaint_engine is not None and not lama_mask.any():
+            windows = []
+        else:
+            windows = lama_windows(frame_rgb, lama_mask, roi_padding, roi_union, lama_config)
+        if windows is None:
+            results[i] = inpaint_with_lama(frame_rgb, lama_mask, model_manager, roi_padding, roi_union, roi_stats, lama_config)
+            continue
+        results[i] = frame.copy()
+        for x1, y1, x2, y2 in windows:
+            crops.append((np.ascontiguousarray(frame_rgb[y1:y2, x1:x2]), np.ascontiguousarray(lama_mask[y1:y2, x1:x2])))
+            owners.append((i, (x1, y1, x2, y2)))
+        if roi_stats is not None:
+            total_pixels = frame.shape[0] * frame.shape[1]
+            processed_pixels = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in windows) if roi_padding is not None else total_pixels
+            roi_stats["processed_pixels"] = roi_stats.get("processed_pixels", 0) + processed_pixels
+            roi_stats["total_pixels"] = roi_stats.get("total_pixels", 0) + total_pixels
+
+    for (i, (x1, y1, x2, y2)), result in zip(owners, batcher.inpaint(crops)):
+        results[i][y1:y2, x1:x2] = result
+    for i, engine_masks in classical.items():
+        if engine_masks:
+            results[i] = inpaint_engine.inpaint_classical(results[i], engine_masks)
+    if patches is not None:
+        for i in inpainted:
+            patches.store(frames[i], masks[i], results[i])
+    return results
+
+def make_lama_batcher(model_manager, lama_batch_size, lama_config=None):
+    """LamaBatcher for --lama-batch-size, or None when batching is off."""
+    if model_manager is None or lama_batch_size <= 1:
+        return None
+    # lama_windows() already counted the HD strategy of these crops' frames
+    return LamaBatcher(model_manager, lama_batch_size, fallback=lambda image, mask: process_image_with_lama(image, mask, model_manager, lama_config, count=False))
+
+def log_batch_stats(batcher: LamaBatcher):
+    if batcher.crops:
+        mode = f"{batcher.forward_calls} forward passes" if batcher.available else "one call each (no batchable LaMa network)"
+        logger.info(f"Batched LaMa: {batcher.crops} crops in {mode}")
+
+def log_patch_stats(patches: PatchReuser):
+    if patches.frames:
+        logger.info(f"Patch reuse: composited the previous patch into {patches.reused} of {patches.frames} inpainted frames ({patches.reused / patches.frames:.1%})")
+
 def make_region_transparent(image: Image.Image, mask: Image.Image):
-    image = image.convert("RGBA")
-    mask = mask.convert("L")
-    transparent_image = Image.new("RGBA", image.size)
-    for x in range(image.width):
-        for y in range(image.height):
-            if mask.getpixel((x, y)) > 0:
-                transparent_image.putpixel((x, y), (0, 0, 0, 0))
-            else:
-                transparent_image.putpixel((x, y), image.getpixel((x, y)))
-    return transparent_image
+    rgba = make_transparent_rgba(np.array(image.convert("RGB")), np.array(mask.convert("L")))
+    return Image.fromarray(rgba)
 
 def is_video_file(file_path):
     """Check if the file is a video based on its extension"""
     video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm']
     return Path(file_path).suffix.lower() in video_extensions
 
-def process_video(input_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt="watermark", progress_offset=0, progress_scale=100):
+def is_image_file(file_path):
+    """Check if the file is an image based on its extension"""
+    image_extensions = ['.jpg', '.jpeg', '.png', '.webp']
+    return Path(file_path).suffix.lower() in image_extensions
+
+def is_media_file(file_path):
+    return is_image_file(file_path) or is_video_file(file_path)
+
+def batched(iterable, size):
+    """Yield lists of up to `size` consecutive items from `iterable`."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_sampled_frames(cap, frame_indices, stats=None):
+    """
+    Yield (frame_idx, frame) for each wanted index while decoding forward only.
+
+    Frames in between are advanced with grab(), which skips the colour conversion
+    and copy done by retrieve(); only the sampled frames are retrieved. `stats`, if
+    given, receives the number of grabbed and retrieved frames.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("grabbed", 0)
+    stats.setdefault("retrieved", 0)
+
+    wanted = sorted(set(frame_indices))
+    if not wanted:
+        return
+
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position > wanted[0]:
+        # Only rewind once, never per sample
+        cap.set(cv2.CAP_PROP_POS_FRAMES, wanted[0])
+        position = wanted[0]
+
+    for frame_idx in wanted:
+        with stage_timer.stage("decode"):
+            while position <= frame_idx:
+                if not cap.grab():
+                    return
+                stats["grabbed"] += 1
+                position += 1
+            ret, frame = cap.retrieve()
+        if not ret:
+            return
+        stats["retrieved"] += 1
+        yield frame_idx, frame
+
+def open_video_writer(output_file, width, height, fps, output_format, audio_source, encoder_options=None):
+    """
+    Open the writer for a processed video.
+
+    Frames are piped into a single ffmpeg process that encodes them and muxes the
+    audio of `audio_source` in the same pass. Without ffmpeg, falls back to
+    cv2.VideoWriter and the video has no audio.
+    """
+    encoder_options = encoder_options or {}
+    if ffmpeg_available():
+        codec = encoder_options.get("codec") or DEFAULT_CODECS.get(output_format.upper(), "libx264")
+        logger.info(f"Encoding {output_file} with ffmpeg ({codec}) and muxing audio from the original video")
+        return FFmpegVideoWriter(output_file, width, height, fps, audio_source, codec, encoder_options.get("crf", 23), encoder_options.get("preset", "medium"))
+
+    logger.warning("FFmpeg is not available. Video will be produced without audio.")
+    # Set codec based on output format
+    if output_format.upper() == "AVI":
+        fourcc = cv2.VideoWriter_fourcc(*'XVID')
+    else:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Default to MP4
+    return cv2.VideoWriter(str(output_file), fourcc, fps, (width, height))
+
+def partial_video_path(output_file):
+    """Where a video is written until it is complete, e.g. clip.partial.mp4 (the suffix tells ffmpeg the container)."""
+    output_file = Path(output_file)
+    return output_file.with_name(f"{output_file.stem}.partial{output_file.suffix}")
+
+def close_video_writer(out, output_file, completed):
+    """
+    Finish a writer from open_video_writer(partial_video_path(output_file), ...).
+
+    A completed video is renamed to `output_file`. Otherwise ffmpeg is stopped
+    and the partial file deleted, so a failed run never leaves a truncated video
+    at the output path that a rerun would skip as already done.
+    """
+    partial_file = partial_video_path(output_file)
+    if not completed:
+        try:
+            getattr(out, "abort", out.release)()
+        finally:
+            partial_file.unlink(missing_ok=True)
+        return
+    try:
+        out.release()
+    except BaseException:
+        partial_file.unlink(missing_ok=True)
+        raise
+    partial_file.replace(output_file)
+
+def fuse_static_mask(bbox_lists: list, image_size: tuple, min_votes: int):
+    """
+    Fuse per-sample detections into one mask by pixel voting.
+
+    Every sample votes for the pixels covered by its bboxes; pixels with at least
+    `min_votes` votes end up in the mask, so one-off false positives drop out.
+    """
+    width, height = image_size
+    votes = np.zeros((height, width), dtype=np.uint16)
+    for bboxes in bbox_lists:
+        covered = np.zeros((height, width), dtype=bool)
+        for x1, y1, x2, y2 in bboxes:
+            # Same inclusive corners as ImageDraw.rectangle
+            covered[max(0, y1):max(0, y2 + 1), max(0, x1):max(0, x2 + 1)] = True
+        votes += covered
+    return np.where(votes >= min_votes, 255, 0).astype(np.uint8)
+
+def detect_static_mask(cap, total_frames, width, height, florence_model, florence_processor, device, max_bbox_percent, detection_prompt="watermark", detection_cache=None, samples=5, vote=0.5, detection_batch_size=1, detection_frontend=None):
+    """
+    Detect on `samples` frames spread across the clip and fuse them into one mask.
+
+    Used by --static-watermark: detection cost is constant per video and the
+    returned mask is reused for every frame.
+    """
+    frame_indices = sorted(set(np.linspace(0, max(0, total_frames - 1), samples).round().astype(int).tolist()))
+
+    bbox_lists = []
+    for batch in batched(read_sampled_frames(cap, frame_indices), detection_batch_size):
+        pil_images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for _, frame in batch]
+        for results in detect_batch(pil_images, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend):
+            bbox_lists.append([b["bbox"] for b in results if b["accepted"]])
+
+    min_votes = max(1, int(np.ceil(vote * len(bbox_lists))))
+    with stage_timer.stage("mask"):
+        mask = fuse_static_mask(bbox_lists, (width, height), min_votes)
+    coverage = np.count_nonzero(mask) / mask.size
+    logger.info(f"Static watermark: fused {len(bbox_lists)} sampled detections (min {min_votes} votes), mask covers {coverage:.2%} of the frame")
+    return mask
+
+def process_video(input_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt="watermark", progress_offset=0, progress_scale=100, detection_batch_size=1, queue_depth=8, detection_cache=None, roi_padding=None, roi_union=False, static_watermark=False, static_samples=5, static_vote=0.5, encoder_options=None, dedup_threshold=None, patch_threshold=None, detection_frontend=None, lama_config=None, lama_batch_size=1, inpaint_engine=None):
     """Process a video file by extracting frames, removing watermarks, and reconstructing the video"""
     cap = cv2.VideoCapture(str(input_path))
     if not cap.isOpened():
@@ -213,107 +663,159 @@ def process_video(input_path, output_path, florence_model, florence_processor, m
     else:
         output_file = output_path.with_suffix(f".{output_format.lower()}")
     
-    # Create a temporary file for the video without audio
-    temp_dir = tempfile.mkdtemp()
-    temp_video_path = Path(temp_dir) / f"temp_no_audio.{output_format.lower()}"
-    
-    # Set codec based on output format
-    if output_format.upper() == "MP4":
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    elif output_format.upper() == "AVI":
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    else:
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Default to MP4
-    
-    out = cv2.VideoWriter(str(temp_video_path), fourcc, fps, (width, height))
-    
-    # Process each frame
-    with tqdm.tqdm(total=total_frames, desc="Processing video frames") as pbar:
-        frame_count = 0
+    metrics.stage("video", input=str(input_path))
+
+    static_mask = None
+    if static_watermark:
+        static_mask = detect_static_mask(cap, total_frames, width, height, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, static_samples, static_vote, detection_batch_size, detection_frontend)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    # Frames go straight into ffmpeg, which also muxes the original audio
+    out = open_video_writer(partial_video_path(output_file), width, height, fps, output_format, input_path, encoder_options)
+
+    # Frames that match the last processed one skip detection and inpainting entirely
+    dedup = FrameDeduplicator(dedup_threshold) if dedup_threshold is not None else None
+
+    def decode_frames():
         while cap.isOpened():
-            ret, frame = cap.read()
+            with stage_timer.stage("decode"):
+                ret, frame = cap.read()
             if not ret:
                 break
-            
-            # Convert frame to PIL Image
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pil_image = Image.fromarray(frame_rgb)
-            
-            # Get watermark mask
-            mask_image = get_watermark_mask(pil_image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt)
-            
-            # Process frame
-            if transparent:
-                # For video, we can't use transparency, so we'll fill with a color or background
-                result_image = make_region_transparent(pil_image, mask_image)
-                # Convert RGBA to RGB by filling transparent areas with white
-                background = Image.new("RGB", result_image.size, (255, 255, 255))
-                background.paste(result_image, mask=result_image.split()[3])
-                result_image = background
-            else:
-                lama_result = process_image_with_lama(np.array(pil_image), np.array(mask_image), model_manager)
-                result_image = Image.fromarray(cv2.cvtColor(lama_result, cv2.COLOR_BGR2RGB))
-            
-            # Convert back to OpenCV format and write to output video
-            frame_result = cv2.cvtColor(np.array(result_image), cv2.COLOR_RGB2BGR)
-            out.write(frame_result)
-            
+            yield {"frame": frame, "duplicate": dedup is not None and dedup.is_duplicate(frame)}
+
+    def detect_stage(items):
+        fresh_items = [item for item in items if not item["duplicate"]]
+        if not fresh_items:
+            return items
+        # Convert frames to PIL Images and get watermark masks for the whole batch
+        pil_images = [Image.fromarray(cv2.cvtColor(item["frame"], cv2.COLOR_BGR2RGB)) for item in fresh_items]
+        mask_images = get_watermark_masks(pil_images, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)
+        for item, pil_image, mask_image in zip(fresh_items, pil_images, mask_images):
+            item["rgb"] = np.array(pil_image)
+            item["mask"] = np.array(mask_image)
+        return items
+
+    roi_stats = {}
+    # Frames go through the inpaint stage in order, so the last patch is always the previous frame's
+    patches = PatchReuser(patch_threshold) if patch_threshold is not None and not transparent else None
+
+    batcher = None if transparent else make_lama_batcher(model_manager, lama_batch_size, lama_config)
+
+    def inpaint_stage(items):
+        fresh_items = [item for item in items if not item["duplicate"]]
+        for item in fresh_items:
+            if static_mask is not None:
+                item["mask"] = static_mask
+        if transparent:
+            for item in fresh_items:
+                # For video, we can't use transparency, so fill the masked region with white
+                item["result"] = fill_masked_region(item["frame"], item["mask"])
+        elif fresh_items:
+            # LaMa already returns BGR, ready for the video writer
+            results = inpaint_frames_with_lama(
+                [item["frame"] for item in fresh_items], [item["mask"] for item in fresh_items], model_manager,
+                roi_padding, roi_union, roi_stats, patches, [item.get("rgb") for item in fresh_items], lama_config, batcher, inpaint_engine,
+            )
+            for item, result in zip(fresh_items, results):
+                item["result"] = result
+        return items
+
+    # Decode, detection, inpainting and encoding each run on their own thread
+    with tqdm.tqdm(total=total_frames, desc="Processing video frames") as pbar:
+        frame_count = 0
+        last_result = None
+
+        def encode_frame(item):
+            nonlocal frame_count, last_result
+            # Frames stay in order, so a duplicate's reference was encoded just before it
+            if not item["duplicate"]:
+                last_result = item["result"]
+            with stage_timer.stage("encode"):
+                out.write(last_result)
+
             # Update progress
             frame_count += 1
             pbar.update(1)
             local_progress = frame_count / total_frames
             progress = int(progress_offset + local_progress * progress_scale)
             print(f"Processing frame {frame_count}/{total_frames}, overall_progress:{progress}%")
-    
-    # Release resources
-    cap.release()
-    out.release()
-    
-    # Combine processed video with original audio using FFmpeg
-    try:
-        logger.info("Merging processed video with original audio...")
-        
-        # Check if FFmpeg is available
-        try:
-            subprocess.check_output(["ffmpeg", "-version"], stderr=subprocess.STDOUT)
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.warning("FFmpeg is not available. Video will be produced without audio.")
-            shutil.copy(str(temp_video_path), str(output_file))
-        else:
-            # Use FFmpeg to combine processed video with original audio
-            ffmpeg_cmd = [
-                "ffmpeg", "-y",
-                "-i", str(temp_video_path),  # Processed video without audio
-                "-i", str(input_path),       # Original video with audio
-                "-c:v", "copy",              # Copy video without re-encoding
-                "-c:a", "aac",               # Encode audio as AAC for better compatibility
-                "-map", "0:v:0",             # Use video track from first file (processed video)
-                "-map", "1:a:0",             # Use audio track from second file (original video)
-                "-shortest",                  # End when the shortest track ends
-                str(output_file)
-            ]
-
-            # Execute FFmpeg
-            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            logger.info("Audio/video merge completed successfully!")
-    except Exception as e:
-        logger.error(f"Error during audio/video merge: {str(e)}")
-        # In case of error, use video without audio
-        shutil.copy(str(temp_video_path), str(output_file))
-    finally:
-        # Clean up temporary files
+            metrics.progress("video", frame_count, total_frames, percent=progress, queue_depths=pipeline.queue_depths())
+
+        stages = [PipelineStage("inpaint", inpaint_stage, lama_batch_size)]
+        if static_mask is None:
+            stages.insert(0, PipelineStage("detect", detect_stage, detection_batch_size))
+        pipeline = FramePipeline(decode_frames(), stages, encode_frame, queue_depth)
+        completed = False
         try:
-            os.remove(str(temp_video_path))
-            os.rmdir(temp_dir)
-        except:
-            pass
-    
+            pipeline.run()
+            completed = True
+        finally:
+            # Release resources
+            cap.release()
+            # ffmpeg finishes encoding and muxes the audio after the last frame
+            with stage_timer.stage("mux"):
+                close_video_writer(out, output_file, completed)
+
     final_progress = progress_offset + progress_scale
+    if roi_padding is not None:
+        log_roi_stats(roi_stats)
+    if dedup is not None:
+        log_dedup_stats(dedup)
+    if patches is not None:
+        log_patch_stats(patches)
+    if batcher is not None:
+        log_batch_stats(batcher)
     logger.info(f"input_path:{input_path}, output_path:{output_file}, overall_progress:{final_progress}")
     return output_file
 
 
-def process_video_two_pass(input_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt="watermark", detection_skip=1, fade_in_sec=0.0, fade_out_sec=0.0, progress_offset=0, progress_scale=100):
+def detect_with_tracking(cap, total_frames, detection_skip, florence_model, florence_processor, device, max_bbox_percent, detection_prompt="watermark", detection_cache=None, track_threshold=0.6, track_margin=32, progress_offset=0, progress_scale=100, detection_frontend=None):
+    """
+    Pass 1 variant that follows watermarks between sparse detection points.
+
+    Florence-2 runs on every `detection_skip`-th frame as usual. The frames in
+    between are decoded and the last detected bboxes are followed with template
+    matching. Florence-2 only runs early when tracking confidence drops below
+    `track_threshold`, so moving or bouncing watermarks no longer need skip 1.
+
+    Returns:
+        (detections, florence_calls) where detections maps frame_idx -> [bbox, ...]
+    """
+    detections = {}
+    florence_calls = 0
+    tracker = BBoxTracker(track_margin)
+
+    with tqdm.tqdm(total=total_frames, desc="Pass 1: Detection + tracking") as pbar:
+        frame_idx = 0
+        while cap.isOpened():
+            with stage_timer.stage("decode"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+            bboxes, confidence = tracker.update(gray)
+            if frame_idx % detection_skip == 0 or (tracker.active and confidence < track_threshold):
+                pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                results = detect_only(pil_image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)
+                florence_calls += 1
+                bboxes = [b["bbox"] for b in results if b["accepted"]]
+                tracker.reset(gray, bboxes)
+
+            if bboxes:
+                detections[frame_idx] = bboxes
+
+            frame_idx += 1
+            pbar.update(1)
+            local_progress = (frame_idx / total_frames) * 0.5  # Pass 1 = 0-50% local
+            progress = int(progress_offset + local_progress * progress_scale)
+            print(f"Pass 1: frame {frame_idx}/{total_frames}, overall_progress:{progress}%")
+            metrics.progress("pass1", frame_idx, total_frames, percent=progress)
+
+    return detections, florence_calls
+
+def process_video_two_pass(input_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt="watermark", detection_skip=1, fade_in_sec=0.0, fade_out_sec=0.0, progress_offset=0, progress_scale=100, detection_batch_size=1, queue_depth=8, detection_cache=None, roi_padding=None, roi_union=False, track=False, track_threshold=0.6, track_margin=32, encoder_options=None, dedup_threshold=None, patch_threshold=None, detection_frontend=None, lama_config=None, lama_batch_size=1, inpaint_engine=None):
     """
     Two-pass video processing with frame skip detection and fade in/out handling.
 
@@ -355,28 +857,45 @@ def process_video_two_pass(input_path, output_path, florence_model, florence_pro
 
     # ========== PASS 1: DETECTION (sparse) ==========
     logger.info("Pass 1: Detecting watermarks...")
+    metrics.stage("pass1", input=str(input_path))
     detections = {}  # frame_idx -> [bbox, bbox, ...]
     detection_frames = list(range(0, total_frames, detection_skip))
 
-    with tqdm.tqdm(total=len(detection_frames), desc="Pass 1: Detection") as pbar:
-        for frame_idx in detection_frames:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            bboxes = detect_only(pil_image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt)
-
-            if bboxes:
-                accepted_bboxes = [b["bbox"] for b in bboxes if b["accepted"]]
-                if accepted_bboxes:
-                    detections[frame_idx] = accepted_bboxes
-
-            pbar.update(1)
-            local_progress = (pbar.n / len(detection_frames)) * 0.5  # Pass 1 = 0-50% local
-            progress = int(progress_offset + local_progress * progress_scale)
-            print(f"Pass 1: frame {frame_idx}/{total_frames}, overall_progress:{progress}%")
+    if track:
+        # Every frame gets tracked bboxes, so each detection covers just its own frame
+        detections, florence_calls = detect_with_tracking(cap, total_frames, detection_skip, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, track_threshold, track_margin, progress_offset, progress_scale, detection_frontend)
+        detection_span = 1
+        logger.info(f"Pass 1 tracking: {florence_calls} Florence-2 calls for {total_frames} frames")
+    else:
+        # Decode forward instead of seeking: with long-GOP codecs every seek re-decodes
+        # from the previous keyframe, which made larger skips slower rather than faster
+        decode_stats = {"grabbed": 0, "retrieved": 0}
+        sampled_frames = read_sampled_frames(cap, detection_frames, decode_stats)
+
+        # Counted here rather than via pbar.n, which stays 0 when tqdm is disabled
+        sampled_count = 0
+        with tqdm.tqdm(total=len(detection_frames), desc="Pass 1: Detection") as pbar:
+            for batch in batched(sampled_frames, detection_batch_size):
+                batch_frames = [frame_idx for frame_idx, _ in batch]
+                pil_images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for _, frame in batch]
+
+                all_bboxes = detect_batch(pil_images, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)
+
+                for frame_idx, bboxes in zip(batch_frames, all_bboxes):
+                    if bboxes:
+                        accepted_bboxes = [b["bbox"] for b in bboxes if b["accepted"]]
+                        if accepted_bboxes:
+                            detections[frame_idx] = accepted_bboxes
+
+                    sampled_count += 1
+                    pbar.update(1)
+                    local_progress = (sampled_count / len(detection_frames)) * 0.5  # Pass 1 = 0-50% local
+                    progress = int(progress_offset + local_progress * progress_scale)
+                    print(f"Pass 1: frame {frame_idx}/{total_frames}, overall_progress:{progress}%")
+                    metrics.progress("pass1", sampled_count, len(detection_frames), percent=progress)
+
+        logger.info(f"Pass 1 decode: grabbed {decode_stats['grabbed']} frames, retrieved {decode_stats['retrieved']} sampled frames")
+        detection_span = detection_skip
 
     logger.info(f"Pass 1 complete: found watermarks in {len(detections)} detection points")
 
@@ -389,7 +908,7 @@ def process_video_two_pass(input_path, output_path, florence_model, florence_pro
         start_frame = max(0, det_frame - fade_in_frames)
         # Expand forwards (fade out) - continue masking after detection
         # Also include frames until next detection point
-        end_frame = min(total_frames, det_frame + detection_skip + fade_out_frames)
+        end_frame = min(total_frames, det_frame + detection_span + fade_out_frames)
 
         for f in range(start_frame, end_frame):
             if f not in frame_masks:
@@ -403,105 +922,109 @@ def process_video_two_pass(input_path, output_path, florence_model, florence_pro
 
     # ========== PASS 2: INPAINTING ==========
     logger.info("Pass 2: Applying inpainting...")
+    metrics.stage("pass2", input=str(input_path))
 
-    # Create temporary file for video without audio
-    temp_dir = tempfile.mkdtemp()
-    temp_video_path = Path(temp_dir) / f"temp_no_audio.{output_format.lower()}"
-
-    # Set codec
-    if output_format.upper() == "MP4":
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    elif output_format.upper() == "AVI":
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    else:
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-
-    out = cv2.VideoWriter(str(temp_video_path), fourcc, fps, (width, height))
+    out = open_video_writer(partial_video_path(output_file), width, height, fps, output_format, input_path, encoder_options)
 
     # Reset video to beginning
     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
 
-    with tqdm.tqdm(total=total_frames, desc="Pass 2: Inpainting") as pbar:
+    # Only frames that need inpainting are deduplicated, and a frame only reuses the
+    # previous output if it would also get the same bboxes
+    dedup = FrameDeduplicator(dedup_threshold) if dedup_threshold is not None else None
+
+    def decode_frames():
         frame_idx = 0
         while cap.isOpened():
-            ret, frame = cap.read()
+            with stage_timer.stage("decode"):
+                ret, frame = cap.read()
             if not ret:
                 break
+            bboxes = [tuple(bbox) for bbox in frame_masks.get(frame_idx, [])]
+            duplicate = is_duplicate_masked_frame(dedup, frame, bboxes)
+            yield {"index": frame_idx, "frame": frame, "duplicate": duplicate}
+            frame_idx += 1
+
+    roi_stats = {}
+    patches = PatchReuser(patch_threshold) if patch_threshold is not None and not transparent else None
+
+    batcher = None if transparent else make_lama_batcher(model_manager, lama_batch_size, lama_config)
 
+    def inpaint_stage(items):
+        pending = []
+        for item in items:
+            frame_idx, frame = item["index"], item["frame"]
+            if item["duplicate"]:
+                continue
             if frame_idx in frame_masks:
                 # This frame needs inpainting
-                pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-
                 # Create mask from bboxes
-                mask = Image.new("L", pil_image.size, 0)
-                draw = ImageDraw.Draw(mask)
-                for bbox in frame_masks[frame_idx]:
-                    x1, y1, x2, y2 = bbox
-                    draw.rectangle([x1, y1, x2, y2], fill=255)
+                with stage_timer.stage("mask"):
+                    mask = Image.new("L", (width, height), 0)
+                    draw = ImageDraw.Draw(mask)
+                    for bbox in frame_masks[frame_idx]:
+                        x1, y1, x2, y2 = bbox
+                        draw.rectangle([x1, y1, x2, y2], fill=255)
 
                 # Apply inpainting or transparency
                 if transparent:
-                    result_image = make_region_transparent(pil_image, mask)
-                    background = Image.new("RGB", result_image.size, (255, 255, 255))
-                    background.paste(result_image, mask=result_image.split()[3])
-                    result_image = background
+                    item["result"] = fill_masked_region(frame, np.array(mask))
                 else:
-                    lama_result = process_image_with_lama(np.array(pil_image), np.array(mask), model_manager)
-                    result_image = Image.fromarray(cv2.cvtColor(lama_result, cv2.COLOR_BGR2RGB))
-
-                frame_result = cv2.cvtColor(np.array(result_image), cv2.COLOR_RGB2BGR)
+                    item["mask"] = np.array(mask)
+                    pending.append(item)
             else:
                 # No watermark detected for this frame, copy original
-                frame_result = frame
+                item["result"] = frame
+        if pending:
+            results = inpaint_frames_with_lama(
+                [item["frame"] for item in pending], [item["mask"] for item in pending], model_manager,
+                roi_padding, roi_union, roi_stats, patches, lama_config=lama_config, batcher=batcher, inpaint_engine=inpaint_engine,
+            )
+            for item, result in zip(pending, results):
+                item["result"] = result
+        return items
 
-            out.write(frame_result)
-            frame_idx += 1
+    with tqdm.tqdm(total=total_frames, desc="Pass 2: Inpainting") as pbar:
+        last_result = None
+
+        def encode_frame(item):
+            nonlocal last_result
+            if not item["duplicate"]:
+                last_result = item["result"]
+            with stage_timer.stage("encode"):
+                out.write(last_result)
+            frame_idx = item["index"] + 1
             pbar.update(1)
             local_progress = 0.5 + (frame_idx / total_frames) * 0.5  # Pass 2 = 50-100% local
             progress = int(progress_offset + local_progress * progress_scale)
             print(f"Pass 2: frame {frame_idx}/{total_frames}, overall_progress:{progress}%")
+            metrics.progress("pass2", frame_idx, total_frames, percent=progress, queue_depths=pipeline.queue_depths())
 
-    cap.release()
-    out.release()
-
-    # ========== MERGE WITH AUDIO ==========
-    try:
-        logger.info("Merging processed video with original audio...")
-        try:
-            subprocess.check_output(["ffmpeg", "-version"], stderr=subprocess.STDOUT)
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.warning("FFmpeg is not available. Video will be produced without audio.")
-            shutil.copy(str(temp_video_path), str(output_file))
-        else:
-            ffmpeg_cmd = [
-                "ffmpeg", "-y",
-                "-i", str(temp_video_path),
-                "-i", str(input_path),
-                "-c:v", "copy",
-                "-c:a", "aac",
-                "-map", "0:v:0",
-                "-map", "1:a:0",
-                "-shortest",
-                str(output_file)
-            ]
-            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            logger.info("Audio/video merge completed successfully!")
-    except Exception as e:
-        logger.error(f"Error during audio/video merge: {str(e)}")
-        shutil.copy(str(temp_video_path), str(output_file))
-    finally:
+        pipeline = FramePipeline(decode_frames(), [PipelineStage("inpaint", inpaint_stage, lama_batch_size)], encode_frame, queue_depth)
+        completed = False
         try:
-            os.remove(str(temp_video_path))
-            os.rmdir(temp_dir)
-        except:
-            pass
+            pipeline.run()
+            completed = True
+        finally:
+            cap.release()
+            # ffmpeg finishes encoding and muxes the audio after the last frame
+            with stage_timer.stage("mux"):
+                close_video_writer(out, output_file, completed)
 
     final_progress = progress_offset + progress_scale
+    if roi_padding is not None:
+        log_roi_stats(roi_stats)
+    if dedup is not None:
+        log_dedup_stats(dedup)
+    if patches is not None:
+        log_patch_stats(patches)
+    if batcher is not None:
+        log_batch_stats(batcher)
     logger.info(f"input_path:{input_path}, output_path:{output_file}, overall_progress:{final_progress}")
     return output_file
 
 
-def handle_one(image_path: Path, output_path: Path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, overwrite, detection_prompt="watermark", detection_skip=1, fade_in=0.0, fade_out=0.0, progress_offset=0, progress_scale=100):
+def handle_one(image_path: Path, output_path: Path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, overwrite, detection_prompt="watermark", detection_skip=1, fade_in=0.0, fade_out=0.0, progress_offset=0, progress_scale=100, detection_batch_size=1, queue_depth=8, detection_cache=None, roi_padding=None, roi_union=False, track=False, track_threshold=0.6, track_margin=32, static_watermark=False, static_samples=5, static_vote=0.5, encoder_options=None, dedup_threshold=None, patch_threshold=None, detection_frontend=None, lama_config=None, lama_batch_size=1, inpaint_engine=None):
     # SAFETY: Never overwrite the input file
     if image_path.resolve() == output_path.resolve():
         logger.error(f"Cannot overwrite input file: {image_path}. Choose a different output path.")
@@ -515,20 +1038,25 @@ def handle_one(image_path: Path, output_path: Path, florence_model, florence_pro
     # Check if it's a video file
     if is_video_file(image_path):
         # Use two-pass if detection_skip > 1 or fade handling is needed
-        use_two_pass = detection_skip > 1 or fade_in > 0 or fade_out > 0
+        # A static watermark is detected once up front, so sparse detection has nothing to add
+        use_two_pass = (detection_skip > 1 or fade_in > 0 or fade_out > 0 or track) and not static_watermark
         if use_two_pass:
-            return process_video_two_pass(image_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt, detection_skip, fade_in, fade_out, progress_offset, progress_scale)
+            return process_video_two_pass(image_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt, detection_skip, fade_in, fade_out, progress_offset, progress_scale, detection_batch_size, queue_depth, detection_cache, roi_padding, roi_union, track, track_threshold, track_margin, encoder_options, dedup_threshold, patch_threshold, detection_frontend, lama_config, lama_batch_size, inpaint_engine)
         else:
-            return process_video(image_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt, progress_offset, progress_scale)
+            return process_video(image_path, output_path, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, detection_prompt, progress_offset, progress_scale, detection_batch_size, queue_depth, detection_cache, roi_padding, roi_union, static_watermark, static_samples, static_vote, encoder_options, dedup_threshold, patch_threshold, detection_frontend, lama_config, lama_batch_size, inpaint_engine)
 
     # Process image
-    image = Image.open(image_path).convert("RGB")
-    mask_image = get_watermark_mask(image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt)
+    with stage_timer.stage("decode"):
+        image = Image.open(image_path).convert("RGB")
+    mask_image = get_watermark_mask(image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, detection_cache, detection_frontend)
 
     if transparent:
         result_image = make_region_transparent(image, mask_image)
     else:
-        lama_result = process_image_with_lama(np.array(image), np.array(mask_image), model_manager)
+        roi_stats = {}
+        lama_result = inpaint_with_lama(np.array(image), np.array(mask_image), model_manager, roi_padding, roi_union, roi_stats, lama_config, inpaint_engine)
+        if roi_padding is not None:
+            log_roi_stats(roi_stats)
         result_image = Image.fromarray(cv2.cvtColor(lama_result, cv2.COLOR_BGR2RGB))
 
     # Determine output format
@@ -550,38 +1078,118 @@ def handle_one(image_path: Path, output_path: Path, florence_model, florence_pro
         output_format = "PNG"
 
     new_output_path = output_path.with_suffix(f".{output_format.lower()}")
-    result_image.save(new_output_path, format=output_format)
+    with stage_timer.stage("encode"):
+        result_image.save(new_output_path, format=output_format)
     # Report progress for this image (end of range)
     final_progress = progress_offset + progress_scale
     print(f"input_path:{image_path}, output_path:{new_output_path}, overall_progress:{final_progress}%")
     return new_output_path
 
-@click.command()
-@click.argument("input_path", type=click.Path(exists=True))
-@click.argument("output_path", type=click.Path(), required=False, default=None)
-@click.option("--preview", is_flag=True, help="Preview mode: detect watermarks and output JSON with base64 image (no processing).")
-@click.option("--overwrite", is_flag=True, help="Overwrite existing files in bulk mode.")
-@click.option("--transparent", is_flag=True, help="Make watermark regions transparent instead of removing.")
-@click.option("--max-bbox-percent", default=10.0, help="Maximum percentage of the image that a bounding box can cover.")
-@click.option("--force-format", type=click.Choice(["PNG", "WEBP", "JPG", "MP4", "AVI"], case_sensitive=False), default=None, help="Force output format. Defaults to input format.")
-@click.option("--detection-prompt", default="watermark", help="Text prompt for watermark detection (e.g. 'watermark', 'watermark Sora logo', 'Getty Images').")
-@click.option("--detection-skip", default=1, type=int, help="Detect watermarks every N frames for videos (1-10). Higher = faster but may miss brief watermarks.")
-@click.option("--fade-in", default=0.0, type=float, help="Extend mask backwards by N seconds to handle fade-in watermarks.")
-@click.option("--fade-out", default=0.0, type=float, help="Extend mask forwards by N seconds to handle fade-out watermarks.")
-def main(input_path: str, output_path: str, preview: bool, overwrite: bool, transparent: bool, max_bbox_percent: float, force_format: str, detection_prompt: str, detection_skip: int, fade_in: float, fade_out: float):
+def load_florence_model(device, precision="fp32"):
+    patch_huggingface_hub()
+    from transformers import AutoProcessor, AutoModelForCausalLM
+    florence_model = AutoModelForCausalLM.from_pretrained(FLORENCE_MODEL_ID, trust_remote_code=True).to(device).eval()
+    florence_model = apply_precision(florence_model, precision, device)
+    florence_processor = AutoProcessor.from_pretrained(FLORENCE_MODEL_ID, trust_remote_code=True)
+    return florence_model, florence_processor
+
+
+class ResidentModels:
+    """
+    Florence-2 and LaMa, loaded on first use and then kept for the life of the process.
+
+    A plain CLI run uses a fresh instance; --serve keeps one alive across jobs.
+    Florence-2 is reloaded when a job asks for a different `precision`.
+    """
+
+    def __init__(self, precision="fp32"):
+        self.precision = precision
+        self._device = None
+        self._florence = None
+        self._florence_precision = None
+        self._lama = None
+
+    @property
+    def device(self):
+        # Resolved on first use, so jobs that load no model never import torch
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"Using device: {self._device}")
+        return self._device
+
+    def florence(self):
+        if self._florence is None or self._florence_precision != self.precision:
+            self._florence = None  # release the old weights before loading the new ones
+            self._florence = load_florence_model(self.device, self.precision)
+            self._florence_precision = self.precision
+            logger.info(f"Florence-2 Model loaded ({self.precision})")
+        return self._florence
+
+    def lama(self):
+        if self._lama is None:
+            self._lama = load_lama_model(self.device)
+            logger.info("LaMa model loaded")
+        return self._lama
+
+
+def run_job(models: ResidentModels, input_path: str, output_path: str = None, preview: bool = False, overwrite: bool = False, transparent: bool = False, max_bbox_percent: float = 10.0, force_format: str = None, detection_prompt: str = "watermark", detection_skip: int = 1, fade_in: float = 0.0, fade_out: float = 0.0, detection_batch_size: int = 1, queue_depth: int = 8, detection_cache: str = None, detection_cache_size: int = DEFAULT_CACHE_SIZE_MB, detection_max_side: int = 0, detection_tiles: int = 1, detection_tile_overlap: float = 0.2, roi: bool = False, roi_padding: int = 64, roi_union: bool = False, hd_strategy: str = "crop", hd_crop_margin: int = 64, hd_crop_trigger: int = 800, hd_resize_limit: int = 1600, lama_batch_size: int = 1, inpaint_engine: str = "lama", track: bool = False, track_threshold: float = 0.6, track_margin: int = 32, static_watermark: bool = False, static_samples: int = 5, static_vote: float = 0.5, dedup: bool = False, dedup_threshold: float = 2.0, reuse_patches: bool = False, patch_threshold: float = 2.0, video_codec: str = None, crf: int = 23, preset: str = "medium", workers: int = 1, incremental: bool = False, precision: str = "fp32"):
+    """Run one CLI invocation (preview or processing) with already-resident models."""
     print("input_path => ", input_path)
     if output_path is None:
-        output_path = input_path.replace(".", "_out.")
+        output_path = str(input_path).replace(".", "_out.")
     # Input validation
     if detection_skip < 1 or detection_skip > 10:
         logger.warning(f"detection_skip must be 1-10, got {detection_skip}. Using 1.")
         detection_skip = max(1, min(10, detection_skip))
+    if detection_batch_size < 1:
+        logger.warning(f"detection_batch_size must be at least 1, got {detection_batch_size}. Using 1.")
+        detection_batch_size = 1
+    if lama_batch_size < 1:
+        logger.warning(f"lama_batch_size must be at least 1, got {lama_batch_size}. Using 1.")
+        lama_batch_size = 1
+    if queue_depth < 1:
+        logger.warning(f"queue_depth must be at least 1, got {queue_depth}. Using 1.")
+        queue_depth = 1
+    if roi and roi_padding < 0:
+        logger.warning(f"roi_padding must be non-negative, got {roi_padding}. Using 0.")
+        roi_padding = 0
+    if not roi:
+        roi_padding = None
+    if not dedup:
+        dedup_threshold = None
+    if not reuse_patches:
+        patch_threshold = None
+    if detection_max_side < 0:
+        logger.warning(f"detection_max_side must be non-negative, got {detection_max_side}. Using 0 (off).")
+        detection_max_side = 0
+    if detection_tiles < 1:
+        logger.warning(f"detection_tiles must be at least 1, got {detection_tiles}. Using 1.")
+        detection_tiles = 1
+    if not 0 <= detection_tile_overlap < 1:
+        logger.warning(f"detection_tile_overlap must be in [0, 1), got {detection_tile_overlap}. Using 0.2.")
+        detection_tile_overlap = 0.2
+    if static_samples < 1:
+        logger.warning(f"static_samples must be at least 1, got {static_samples}. Using 1.")
+        static_samples = 1
     if fade_in < 0:
         fade_in = 0
     if fade_out < 0:
         fade_out = 0
+    models.precision = precision
 
     input_path = Path(input_path)
+    cache = DetectionCache(detection_cache, detection_cache_size * 1024 * 1024) if detection_cache else None
+    encoder_options = {"codec": video_codec, "crf": crf, "preset": preset}
+    # Built once here; every frame of the job shares its iopaint request objects
+    lama_config = LamaConfig(hd_strategy, max(0, hd_crop_margin), max(1, hd_crop_trigger), max(1, hd_resize_limit))
+    if repr(lama_config) == repr(DEFAULT_LAMA_CONFIG):
+        lama_config = None
+    # LaMa only, as before, unless another engine is asked for
+    engine = InpaintEngine(inpaint_engine) if inpaint_engine != "lama" else None
+    frontend = None
+    if detection_max_side or detection_tiles > 1:
+        frontend = DetectionFrontEnd(detection_max_side or None, detection_tiles, detection_tile_overlap)
 
     # ========== PREVIEW MODE ==========
     if preview:
@@ -590,20 +1198,19 @@ def main(input_path: str, output_path: str, preview: bool, overwrite: bool, tran
         from io import BytesIO
         import random
 
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        florence_model = AutoModelForCausalLM.from_pretrained("microsoft/Florence-2-large", trust_remote_code=True).to(device).eval()
-        florence_processor = AutoProcessor.from_pretrained("microsoft/Florence-2-large", trust_remote_code=True)
+        device = models.device
+        florence_model, florence_processor = models.florence()
 
         # Get sample image from input
         if input_path.is_dir():
-            # Get a random image from directory
-            images = list(input_path.glob("*.[jp][pn]g")) + list(input_path.glob("*.webp"))
-            videos = list(input_path.glob("*.mp4")) + list(input_path.glob("*.avi")) + list(input_path.glob("*.mov"))
-            files = images + videos
-            if not files:
+            # Get a random file from the directory tree (reservoir sampling, no full listing)
+            sample_path = None
+            for count, file_path in enumerate(iter_files(input_path, is_media_file), start=1):
+                if random.randrange(count) == 0:
+                    sample_path = file_path
+            if sample_path is None:
                 print(json.dumps({"error": "No supported files found in directory"}))
                 return
-            sample_path = random.choice(files)
         else:
             sample_path = input_path
 
@@ -627,7 +1234,7 @@ def main(input_path: str, output_path: str, preview: bool, overwrite: bool, tran
             source_frame = None
 
         # Run detection
-        detections = detect_only(pil_image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt)
+        detections = detect_only(pil_image, florence_model, florence_processor, device, max_bbox_percent, detection_prompt, cache, frontend)
 
         # Draw bounding boxes on image
         draw = ImageDraw.Draw(pil_image)
@@ -660,35 +1267,87 @@ def main(input_path: str, output_path: str, preview: bool, overwrite: bool, tran
     # ========== NORMAL PROCESSING MODE ==========
     print("output_path =>", output_path)
     output_path = Path(output_path)
+    # The folder scan skips the output folder, so writing into the input folder would find nothing to do
+    if input_path.is_dir() and output_path.resolve() == input_path.resolve():
+        raise click.UsageError(f"Output folder must differ from the input folder: {input_path}")
+    stage_timer.reset()
+    metrics.start(input=str(input_path), output=str(output_path))
+
+    handle_options = dict(
+        transparent=transparent, max_bbox_percent=max_bbox_percent, force_format=force_format, overwrite=overwrite,
+        detection_prompt=detection_prompt, detection_skip=detection_skip, fade_in=fade_in, fade_out=fade_out,
+        detection_batch_size=detection_batch_size, queue_depth=queue_depth, detection_cache=cache,
+        roi_padding=roi_padding, roi_union=roi_union, track=track, track_threshold=track_threshold, track_margin=track_margin,
+        static_watermark=static_watermark, static_samples=static_samples, static_vote=static_vote, encoder_options=encoder_options,
+        dedup_threshold=dedup_threshold, patch_threshold=patch_threshold, detection_frontend=frontend,
+        lama_config=lama_config, lama_batch_size=lama_batch_size, inpaint_engine=engine,
+    )
 
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Using device: {device}")
-    florence_model = AutoModelForCausalLM.from_pretrained("microsoft/Florence-2-large", trust_remote_code=True).to(device).eval()
-    florence_processor = AutoProcessor.from_pretrained("microsoft/Florence-2-large", trust_remote_code=True)
-    logger.info("Florence-2 Model loaded")
+    manifest = None
+    if incremental:
+        output_params = {key: handle_options[key] for key in OUTPUT_OPTIONS}
+        output_params["model"] = detection_model_id(precision)
+        if input_path.is_dir():
+            output_path.mkdir(parents=True, exist_ok=True)
+            manifest = Manifest(output_path, input_path, output_params)
+        else:
+            manifest_dir = output_path if output_path.is_dir() else output_path.parent
+            manifest = Manifest(manifest_dir, input_path.parent, output_params)
+        # Whatever reaches handle_one is new or stale, so its old output is replaced
+        handle_options["overwrite"] = True
 
-    if not transparent:
-        model_manager = load_lama_model(device)
-        logger.info("LaMa model loaded")
-    else:
-        model_manager = None
+    def load_models():
+        florence_model, florence_processor = models.florence()
+        model_manager = models.lama() if needs_lama(handle_options) else None
+        return florence_model, florence_processor, model_manager, models.device
 
     if input_path.is_dir():
         if not output_path.exists():
             output_path.mkdir(parents=True)
 
-        # Include video files in the search
-        images = list(input_path.glob("*.[jp][pn]g")) + list(input_path.glob("*.webp"))
-        videos = list(input_path.glob("*.mp4")) + list(input_path.glob("*.avi")) + list(input_path.glob("*.mov")) + list(input_path.glob("*.mkv"))
-        files = images + videos
-        total_files = len(files)
-
-        for idx, file_path in enumerate(tqdm.tqdm(files, desc="Processing files")):
-            output_file = output_path / file_path.name
-            # Calculate progress range for this file
-            progress_offset = int(idx / total_files * 100)
-            progress_scale = int(100 / total_files)
-            handle_one(file_path, output_file, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, overwrite, detection_prompt, detection_skip, fade_in, fade_out, progress_offset, progress_scale)
+        # Walk subfolders on a background thread; processing starts with the first file found
+        scan = DirectoryScan(input_path, is_media_file, exclude=output_path)
+
+        def output_for(file_path):
+            # Mirror the input subfolder layout under output_path
+            output_file = output_path / file_path.relative_to(input_path)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            return output_file
+
+        if workers > 1:
+            process_files_in_workers(scan, output_for, workers, handle_options, manifest, precision)
+        else:
+            loaded = None
+            progress_offset = 0
+            with tqdm.tqdm(desc="Processing files") as pbar:
+                for idx, file_path in enumerate(scan):
+                    # Progress is measured against the files found so far and never goes backwards
+                    total_files = scan.found
+                    pbar.total = total_files
+                    progress_offset = max(progress_offset, int(idx / total_files * 100))
+                    progress_scale = max(0, int((idx + 1) / total_files * 100) - progress_offset)
+                    if manifest is not None and manifest.is_current(file_path):
+                        logger.info(f"Up to date, skipping: {file_path}")
+                        pbar.update(1)
+                        continue
+                    output_file = output_for(file_path)
+                    if output_file.exists() and not handle_options["overwrite"]:
+                        logger.info(f"Skipping existing file: {output_file}")
+                        pbar.update(1)
+                        continue
+                    if loaded is None:
+                        # Models load with the first file that actually needs processing
+                        loaded = load_models()
+                    florence_model, florence_processor, model_manager, device = loaded
+                    print(f"Processing file {idx + 1}/{total_files}{'' if scan.finished else '+'}: {file_path}")
+                    result = handle_one(file_path, output_file, florence_model, florence_processor, model_manager, device, progress_offset=progress_offset, progress_scale=progress_scale, **handle_options)
+                    if manifest is not None and result is not None:
+                        manifest.record(file_path, result)
+                    metrics.file_done(file_path, result)
+                    metrics.progress("files", idx + 1, scan.found, percent=progress_offset + progress_scale)
+                    pbar.update(1)
+    elif manifest is not None and manifest.is_current(input_path):
+        logger.info(f"Up to date, skipping: {input_path}")
     else:
         # Single file mode - if output is a directory, construct file path
         if output_path.is_dir():
@@ -703,8 +1362,358 @@ def main(input_path: str, output_path: str, preview: bool, overwrite: bool, tran
             else:
                 output_file = output_file.with_suffix(".mp4")  # Default to mp4
 
-        handle_one(input_path, output_file, florence_model, florence_processor, model_manager, device, transparent, max_bbox_percent, force_format, overwrite, detection_prompt, detection_skip, fade_in, fade_out)
-        print(f"input_path:{input_path}, output_path:{output_file}, overall_progress:100")
+        if output_file.exists() and not handle_options["overwrite"]:
+            # Checked before loading anything, so skipping costs no model startup
+            logger.info(f"Skipping existing file: {output_file}")
+        else:
+            florence_model, florence_processor, model_manager, device = load_models()
+            result = handle_one(input_path, output_file, florence_model, florence_processor, model_manager, device, **handle_options)
+            if manifest is not None and result is not None:
+                manifest.record(input_path, result)
+            metrics.file_done(input_path, result)
+            print(f"input_path:{input_path}, output_path:{output_file}, overall_progress:100")
+
+    if manifest is not None:
+        manifest.save()
+        logger.info(f"Incremental: {manifest.skipped} up-to-date files skipped")
+    if cache is not None:
+        logger.info(f"Detection cache: {cache.hits} hits, {cache.misses} misses")
+    if engine is not None and engine.counts:
+        logger.info("Inpaint engines: " + ", ".join(f"{name} {count} regions" for name, count in sorted(engine.counts.items())))
+    if lama_config is not None and lama_config.counts:
+        logger.info("LaMa HD strategy: " + ", ".join(f"{name} {count}x" for name, count in sorted(lama_config.counts.items())))
+    metrics.finish()
+
+
+# Per-process state of directory workers (see process_files_in_workers)
+_worker_models = None
+_worker_options = None
+_worker_stdout = None
+_worker_init_error = None
+
+_PROGRESS_PATTERN = re.compile(r"overall_progress:(\d+)")
+
+
+class _ProgressRelay:
+    """
+    Stand-in for sys.stdout inside a directory worker.
+
+    Output is passed through, but each "overall_progress:NN" only describes the
+    worker's current file: it is relabelled "file_progress:NN" and sent to the
+    parent, which prints the combined overall_progress for all workers.
+    """
+
+    def __init__(self, stream, progress_queue):
+        self.stream = stream
+        self.progress_queue = progress_queue
+        self.file_index = None
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            match = _PROGRESS_PATTERN.search(line)
+            if match and self.file_index is not None:
+                self.progress_queue.put((self.file_index, int(match.group(1))))
+                line = line.replace("overall_progress:", "file_progress:")
+            self.stream.write(line + "\n")
+            self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def needs_lama(options):
+    """Whether handle_one with these options can call LaMa (so the model has to be loaded)."""
+    engine = options.get("inpaint_engine")
+    return not options["transparent"] and (engine is None or engine.uses_lama)
+
+
+def take_counters(options):
+    """
+    Counters of the shared option objects since the last call, which start over from zero.
+
+    A --workers process sends them back with each file; add_counters() sums them
+    into the parent's objects, which produce the end-of-job report.
+    """
+    counters = {}
+    cache = options.get("detection_cache")
+    if cache is not None:
+        counters["detection_cache"] = (cache.hits, cache.misses)
+        cache.hits = cache.misses = 0
+    for key in ("inpaint_engine", "lama_config"):
+        if options.get(key) is not None:
+            counters[key] = options[key].take_counts()
+    return counters
+
+
+def add_counters(options, counters):
+    for key, counts in counters.items():
+        if key == "detection_cache":
+            options[key].hits += counts[0]
+            options[key].misses += counts[1]
+            continue
+        totals = options[key].counts
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + count
+
+
+class WorkerInitError(RuntimeError):
+    """A directory worker could not load its models; the whole run is aborted."""
+
+
+def _init_directory_worker(options, progress_queue, precision):
+    global _worker_models, _worker_options, _worker_stdout, _worker_init_error
+    _worker_options = options
+    sys.stdout = _worker_stdout = _ProgressRelay(sys.stdout, progress_queue)
+    # An initializer that raises makes multiprocessing.Pool respawn the worker forever,
+    # so the error is kept and raised by the first task instead
+    try:
+        _worker_models = ResidentModels(precision)
+        _worker_models.florence()
+        if needs_lama(options):
+            _worker_models.lama()
+    except Exception as e:
+        _worker_init_error = f"{type(e).__name__}: {e}"
+
+
+def _process_file_in_worker(task):
+    if _worker_init_error is not None:
+        raise WorkerInitError(f"Worker could not load the models: {_worker_init_error}")
+    index, file_path, output_file = task
+    _worker_stdout.file_index = index
+    florence_model, florence_processor = _worker_models.florence()
+    model_manager = _worker_models.lama() if needs_lama(_worker_options) else None
+    result = handle_one(file_path, output_file, florence_model, florence_processor, model_manager, _worker_models.device, **_worker_options)
+    sys.stdout.flush()
+    return index, (result, take_counters(_worker_options))
+
+
+def process_files_in_workers(files, output_for, workers: int, options: dict, manifest=None, precision: str = "fp32"):
+    """
+    Process the files of a DirectoryScan on a pool of `workers` processes.
+
+    Each worker loads Florence-2/LaMa once and then takes one file at a time, so a
+    long video only ever occupies a single worker. At most workers - 1 videos run
+    at once while images are waiting, which keeps the image backlog moving.
+    `output_for(file_path)` gives the output path of each file. With a manifest,
+    up-to-date files are skipped and finished ones are recorded by this process.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    progress_queue = ctx.Queue()
+    done_queue = queue.Queue()
+
+    tasks = []  # index -> (file_path, output_file)
+    fractions = {}
+    finished = 0
+    last_progress = -1
+    print_lock = threading.Lock()
+
+    def report():
+        nonlocal last_progress
+        # Measured against the running total; never reported as going backwards
+        total_files = max(files.found, 1)
+        progress = int(sum(fractions.values()) / total_files * 100)
+        if not files.finished or finished < files.found:
+            # A file's own 100% arrives before its result; only the last result completes the run
+            progress = min(progress, 99)
+        if progress > last_progress or (files.finished and finished == files.found):
+            last_progress = max(progress, last_progress)
+            # One write per line so it cannot interleave with the workers' output
+            suffix = "" if files.finished else "+"
+            print(f"Processed {finished}/{files.found}{suffix} files, overall_progress:{progress}%\n", end="", flush=True)
+            metrics.progress("files", finished, files.found, percent=progress)
+
+    def relay_progress():
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                break
+            index, file_progress = item
+            with print_lock:
+                fractions[index] = max(fractions.get(index, 0.0), min(file_progress, 100) / 100)
+                report()
+
+    listener = threading.Thread(target=relay_progress, daemon=True)
+    listener.start()
+
+    file_iter = iter(files)
+    exhausted = False
+    pending_images = deque()
+    pending_videos = deque()
+    max_videos = max(1, workers - 1)
+    running = {}  # index -> is_video
+
+    def pull():
+        nonlocal exhausted, finished
+        # Look ahead until an image is queued, so a run of videos cannot hide the images behind it
+        while not exhausted and not pending_images and len(pending_videos) < workers:
+            try:
+                file_path = next(file_iter)
+            except StopIteration:
+                exhausted = True
+                break
+            index = len(tasks)
+            if manifest is not None and manifest.is_current(file_path):
+                logger.info(f"Up to date, skipping: {file_path}")
+                tasks.append((file_path, None))
+                with print_lock:
+                    finished += 1
+                    fractions[index] = 1.0
+                    report()
+                continue
+            tasks.append((file_path, output_for(file_path)))
+            (pending_videos if is_video_file(file_path) else pending_images).append(index)
+
+    try:
+        with ctx.Pool(workers, initializer=_init_directory_worker, initargs=(options, progress_queue, precision)) as pool:
+            while True:
+                pull()
+                while len(running) < workers:
+                    if pending_videos and (sum(running.values()) < max_videos or not pending_images):
+                        index, is_video = pending_videos.popleft(), True
+                    elif pending_images:
+                        index, is_video = pending_images.popleft(), False
+                    else:
+                        break
+                    running[index] = is_video
+                    file_path, output_file = tasks[index]
+                    pool.apply_async(
+                        _process_file_in_worker, ((index, file_path, output_file),),
+                        callback=done_queue.put,
+                        error_callback=lambda e, index=index: done_queue.put((index, e)),
+                    )
+                    pull()
+
+                if not running:
+                    break
+
+                index, result = done_queue.get()
+                del running[index]
+                if isinstance(result, WorkerInitError):
+                    # Leaving the with block terminates the pool
+                    raise result
+                if not isinstance(result, BaseException):
+                    result, counters = result
+                    add_counters(options, counters)
+                if isinstance(result, BaseException):
+                    logger.error(f"Failed to process {tasks[index][0]}: {result}")
+                elif manifest is not None and result is not None:
+                    manifest.record(tasks[index][0], result)
+                if not isinstance(result, BaseException):
+                    metrics.file_done(tasks[index][0], result)
+                with print_lock:
+                    finished += 1
+                    fractions[index] = 1.0
+                    report()
+    finally:
+        progress_queue.put(None)
+        listener.join()
+        progress_queue.close()
+        progress_queue.join_thread()
+
+@click.command()
+@click.argument("input_path", type=click.Path(exists=True), required=False, default=None)
+@click.argument("output_path", type=click.Path(), required=False, default=None)
+@click.option("--preview", is_flag=True, help="Preview mode: detect watermarks and output JSON with base64 image (no processing).")
+@click.option("--overwrite", is_flag=True, help="Overwrite existing files in bulk mode.")
+@click.option("--transparent", is_flag=True, help="Make watermark regions transparent instead of removing.")
+@click.option("--max-bbox-percent", default=10.0, help="Maximum percentage of the image that a bounding box can cover.")
+@click.option("--force-format", type=click.Choice(["PNG", "WEBP", "JPG", "MP4", "AVI"], case_sensitive=False), default=None, help="Force output format. Defaults to input format.")
+@click.option("--detection-prompt", default="watermark", help="Text prompt for watermark detection (e.g. 'watermark', 'watermark Sora logo', 'Getty Images').")
+@click.option("--detection-skip", default=1, type=int, help="Detect watermarks every N frames for videos (1-10). Higher = faster but may miss brief watermarks.")
+@click.option("--fade-in", default=0.0, type=float, help="Extend mask backwards by N seconds to handle fade-in watermarks.")
+@click.option("--fade-out", default=0.0, type=float, help="Extend mask forwards by N seconds to handle fade-out watermarks.")
+@click.option("--detection-batch-size", default=1, type=int, help="Number of video frames sent to Florence-2 in a single generate call.")
+@click.option("--detection-cache", type=click.Path(file_okay=False), default=None, help="Directory for a persistent cache of raw detections keyed by content, prompt and model.")
+@click.option("--detection-cache-size", default=DEFAULT_CACHE_SIZE_MB, type=int, help="Maximum size of the detection cache in MB; least recently used entries are evicted.")
+@click.option("--detection-max-side", default=0, type=int, help="Downscale images/frames whose longer side exceeds this many pixels before detection (0 = off). Bboxes are mapped back to full resolution.")
+@click.option("--detection-tiles", default=1, type=int, help=f"For inputs of {DEFAULT_TILE_MIN_SIDE} px or more, also detect on an N x N grid of overlapping tiles, so small logos survive the downscale (1 = off).")
+@click.option("--detection-tile-overlap", default=0.2, type=float, help="Overlap between neighbouring detection tiles, as a fraction of the tile size.")
+@click.option("--roi", is_flag=True, help="Inpaint only padded crops around each mask region instead of the full frame.")
+@click.option("--roi-padding", default=64, type=int, help="Context pixels added around each mask region in --roi mode.")
+@click.option("--roi-union", is_flag=True, help="In --roi mode, inpaint one crop around all mask regions instead of one per region.")
+@click.option("--hd-strategy", default="crop", type=click.Choice(HD_STRATEGIES), help="How LaMa handles large images: crop around each mask region, resize to --hd-resize-limit, original resolution, or auto (picked per image from its size and mask coverage).")
+@click.option("--hd-crop-margin", default=64, type=int, help="Context pixels around each mask region for the crop strategy.")
+@click.option("--hd-crop-trigger", default=800, type=int, help="Longer side (pixels) above which the crop strategy crops instead of inpainting the whole image.")
+@click.option("--hd-resize-limit", default=1600, type=int, help="Longer side (pixels) the resize strategy scales large images down to.")
+@click.option("--lama-batch-size", default=1, type=int, help="Videos: inpaint the LaMa crops of up to N frames in one forward pass (same-size crops batch together, others by size bucket).")
+@click.option("--inpaint-engine", default="lama", type=click.Choice(INPAINT_ENGINES), help="lama, OpenCV's telea or ns (no model needed, fast on thin text over flat backgrounds), or auto (picked per mask region from its area and the texture around it).")
+@click.option("--track", is_flag=True, help="Follow detected watermarks between detection points with template matching (for moving watermarks).")
+@click.option("--track-threshold", default=0.6, type=float, help="Tracking confidence (0-1) below which Florence-2 re-detects early in --track mode.")
+@click.option("--track-margin", default=32, type=int, help="Pixels around the last position searched for a tracked watermark.")
+@click.option("--static-watermark", is_flag=True, help="Detect once on sampled frames, fuse a single mask and reuse it for every frame of a video.")
+@click.option("--static-samples", default=5, type=click.IntRange(min=1), help="Number of frames spread across the video that are sampled in --static-watermark mode.")
+@click.option("--static-vote", default=0.5, type=click.FloatRange(0, 1, min_open=True), help="Fraction of sampled frames (0-1) that must agree on a pixel for it to enter the static mask.")
+@click.option("--dedup", is_flag=True, help="Videos: reuse the previous cleaned frame for frames that are (nearly) identical to it, skipping detection and inpainting.")
+@click.option("--dedup-threshold", default=2.0, type=float, help="Largest difference (gray levels, on 8x8 block means) at which a frame still counts as a duplicate for --dedup.")
+@click.option("--reuse-patches", is_flag=True, help="Videos: when the mask and its surroundings did not change since the previous frame, reuse its inpainted patch instead of running LaMa again.")
+@click.option("--patch-threshold", default=2.0, type=float, help="Largest difference (gray levels, on 4x4 block means) around the mask at which --reuse-patches still reuses the previous patch.")
+@click.option("--video-codec", default=None, help="ffmpeg video encoder for video output (default: libx264 for MP4, mpeg4 for AVI).")
+@click.option("--crf", default=23, type=int, help="Constant rate factor for libx264/libx265 video output (lower = better quality, larger files).")
+@click.option("--preset", default="medium", type=click.Choice(["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]), help="libx264/libx265 encoder preset (speed vs compression).")
+@click.option("--workers", default=1, type=int, help="Directory mode: number of worker processes, each with its own resident Florence-2/LaMa.")
+@click.option("--incremental", is_flag=True, help="Keep a manifest in the output folder and only process inputs whose content or output-affecting options changed since the last run.")
+@click.option("--precision", default="fp32", type=click.Choice(PRECISIONS), help="Florence-2 inference precision: fp32, bf16 (autocast) or int8 (dynamic quantization of the linear layers, CPU only). See benchmarks/precision.py for the accuracy/speed trade-off.")
+@click.option("--queue-depth", default=8, type=int, help="Maximum frames buffered between video pipeline stages (caps memory use).")
+@click.option("--serve", is_flag=True, help="Start a resident model server that keeps Florence-2 and LaMa loaded between jobs.")
+@click.option("--client", is_flag=True, help="Forward this job to a running --serve instance instead of loading models locally.")
+@click.option("--server-address", default=model_server.DEFAULT_SERVER_ADDRESS, show_default=True, help="Unix socket path (default where available; only this user can connect) or host:port (TCP, authenticated with a token file in ~/.remwm) used by --serve and --client.")
+@click.option("--metrics-fd", default=None, type=int, help="Write JSON-lines metrics events (progress, stage timings, fps, queue depths, peak RSS, ETA) to this file descriptor.")
+@click.option("--metrics-file", default=None, type=click.Path(dir_okay=False), envvar=METRICS_FILE_ENV, help=f"Append JSON-lines metrics events to this file (also read from ${METRICS_FILE_ENV}).")
+def main(input_path: str, output_path: str, preview: bool, overwrite: bool, transparent: bool, max_bbox_percent: float, force_format: str, detection_prompt: str, detection_skip: int, fade_in: float, fade_out: float, detection_batch_size: int, queue_depth: int, detection_cache: str, detection_cache_size: int, detection_max_side: int, detection_tiles: int, detection_tile_overlap: float, roi: bool, roi_padding: int, roi_union: bool, hd_strategy: str, hd_crop_margin: int, hd_crop_trigger: int, hd_resize_limit: int, lama_batch_size: int, inpaint_engine: str, track: bool, track_threshold: float, track_margin: int, static_watermark: bool, static_samples: int, static_vote: float, dedup: bool, dedup_threshold: float, reuse_patches: bool, patch_threshold: float, video_codec: str, crf: int, preset: str, workers: int, incremental: bool, precision: str, serve: bool, client: bool, server_address: str, metrics_fd: int, metrics_file: str):
+    job_params = click.get_current_context().params.copy()
+    for key in ("serve", "client", "server_address", "metrics_fd", "metrics_file"):
+        job_params.pop(key)
+
+    if metrics_fd is not None:
+        metrics.open(metrics_fd)
+    elif metrics_file:
+        metrics.open(metrics_file)
+
+    def run_with_metrics(models, params):
+        try:
+            run_job(models, **params)
+        except BaseException as e:
+            metrics.finish(status="error", error=str(e))
+            raise
+
+    # ========== RESIDENT SERVER MODE ==========
+    if serve:
+        models = ResidentModels(precision)
+        models.florence()
+        models.lama()
+        model_server.serve(server_address, lambda params: run_with_metrics(models, params))
+        return
+
+    if input_path is None:
+        raise click.UsageError("Missing argument 'INPUT_PATH'.")
+
+    # ========== CLIENT MODE ==========
+    if client:
+        if output_path is None:
+            output_path = input_path.replace(".", "_out.")
+        # The server does not share our working directory
+        job_params["input_path"] = str(Path(input_path).resolve())
+        job_params["output_path"] = str(Path(output_path).resolve())
+        if detection_cache:
+            job_params["detection_cache"] = str(Path(detection_cache).resolve())
+
+        # The job's metrics events come back over the connection and go to our own channel
+        response = model_server.send_command(
+            server_address, {"command": "run", "params": job_params, "metrics": metrics.enabled}, on_metrics=metrics.relay,
+        )
+        if response is None:
+            logger.warning(f"No model server at {server_address}, processing locally")
+        elif response["status"] == "ok":
+            return
+        else:
+            logger.error(f"Model server job failed: {response.get('error')}")
+            sys.exit(1)
+
+    run_with_metrics(ResidentModels(), job_params)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+def _binary_mask(mask):
+    """Return a boolean HxW array from an "L" mask array or an HxWx1 array."""
+    mask = np.asarray(mask)
+    if mask.ndim == 3:
+        mask = mask[:, :, 0]
+    return mask > 0
+
+
+def make_transparent_rgba(frame, mask):
+    """
+    Build an RGBA array where every masked pixel is fully transparent.
+
+    Matches the old per-pixel loop: masked pixels become (0, 0, 0, 0) and every
+    other pixel keeps its colour with full opacity. `frame` is an HxWx3 uint8 array
+    and the channel order is preserved, so RGB in gives RGBA out.
+    """
+    frame = np.asarray(frame)
+    height, width = frame.shape[:2]
+
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[:, :, :3] = frame[:, :, :3]
+    rgba[:, :, 3] = 255
+    rgba[_binary_mask(mask)] = 0
+    return rgba
+
+
+def fill_masked_region(frame, mask, color=(255, 255, 255)):
+    """
+    Flatten the transparent result onto a solid background in one step.
+
+    Equivalent to compositing make_transparent_rgba() over a `color` background,
+    without materializing the RGBA image. `color` must be in the frame's channel
+    order (the default white is the same for RGB and BGR).
+    """
+    result = np.array(frame, dtype=np.uint8, copy=True)
+    result[_binary_mask(mask)] = color
+    return result
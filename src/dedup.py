@@ -0,0 +1,121 @@
+import numpy as np
+
+from src.lazy import lazy_module
+
+cv2 = lazy_module("cv2")
+
+
+def block_means(image, cell):
+    """Grayscale thumbnail in which every pixel is the mean of a `cell` x `cell` block."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    height, width = gray.shape
+    size = (max(1, width // cell), max(1, height // cell))
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def _matches(a, b, threshold):
+    return a.shape == b.shape and np.abs(a - b).max() <= threshold
+
+
+class FrameDeduplicator:
+    """
+    Flag video frames that match the last processed frame within a tolerance.
+
+    Frames are compared on a grayscale thumbnail in which every pixel is the mean of a
+    `cell` x `cell` block. Encoder noise averages out, but a localized change larger than
+    `threshold` gray levels (a cursor, a slide transition) still ends the run. Frames
+    are compared against the last frame that was *not* a duplicate, so a slow fade
+    cannot drift through a chain of small differences. `context` (e.g. the mask that
+    frame would get) must also be equal for a frame to count as a duplicate.
+    """
+
+    def __init__(self, threshold=2.0, cell=8):
+        self.threshold = threshold
+        self.cell = cell
+        self.frames = 0
+        self.duplicates = 0
+        self._reference = None
+        self._context = None
+
+    @property
+    def hit_rate(self):
+        return self.duplicates / self.frames if self.frames else 0.0
+
+    def is_duplicate(self, frame, context=None):
+        """Return True if `frame` can reuse the output of the last non-duplicate frame."""
+        thumbnail = block_means(frame, self.cell)
+        self.frames += 1
+        if self._reference is not None and context == self._context and _matches(thumbnail, self._reference, self.threshold):
+            self.duplicates += 1
+            return True
+        self._reference = thumbnail
+        self._context = context
+        return False
+
+    def reset(self):
+        """Forget the reference frame, e.g. after writing a frame that did not go through is_duplicate()."""
+        self._reference = None
+        self._context = None
+
+
+class PatchReuser:
+    """
+    Reuse the last inpainted patch when the neighbourhood of the mask has not changed.
+
+    The neighbourhood is the mask's bounding box grown by `padding` pixels, which is
+    what the inpainting result under the mask depends on. It is compared with the
+    previous frame's on `cell` x `cell` block means. If the mask is identical and no
+    block differs by more than `threshold` gray levels, reuse() composites the
+    previous result into the masked pixels of the new frame. Frames must be passed
+    in order, because only the last stored patch is kept.
+    """
+
+    def __init__(self, threshold=2.0, padding=16, cell=4):
+        self.threshold = threshold
+        self.padding = padding
+        self.cell = cell
+        self.frames = 0
+        self.reused = 0
+        self._mask = None
+        self._window = None
+        self._neighbourhood = None
+        self._patch = None
+
+    def _window_of(self, mask):
+        ys, xs = np.nonzero(mask)
+        if len(xs) == 0:
+            return None
+        height, width = mask.shape[:2]
+        return (
+            max(0, int(xs.min()) - self.padding),
+            max(0, int(ys.min()) - self.padding),
+            min(width, int(xs.max()) + 1 + self.padding),
+            min(height, int(ys.max()) + 1 + self.padding),
+        )
+
+    def reuse(self, frame, mask):
+        """Return `frame` with the previous patch composited in, or None if it has to be inpainted."""
+        self.frames += 1
+        if self._mask is None or not np.array_equal(mask, self._mask):
+            return None
+        x1, y1, x2, y2 = self._window
+        if not _matches(block_means(frame[y1:y2, x1:x2], self.cell), self._neighbourhood, self.threshold):
+            return None
+        self.reused += 1
+        result = frame.copy()
+        window = result[y1:y2, x1:x2]
+        masked = mask[y1:y2, x1:x2] > 0
+        window[masked] = self._patch[masked]
+        return result
+
+    def store(self, frame, mask, result):
+        """Remember the inpainted `result` of `frame` for the following frames."""
+        window = self._window_of(mask)
+        if window is None:
+            self._mask = None
+            return
+        x1, y1, x2, y2 = window
+        self._mask = mask.copy()
+        self._window = window
+        self._neighbourhood = block_means(frame[y1:y2, x1:x2], self.cell)
+        self._patch = result[y1:y2, x1:x2].copy()
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+DEFAULT_CACHE_SIZE_MB = 512
+
+
+class DetectionCache:
+    """
+    Content-addressed on-disk cache of raw Florence-2 detections.
+
+    Entries are keyed by the decoded pixels, the detection prompt and the model id,
+    and hold the bboxes *before* the max_bbox_percent filter, so changing the
+    threshold or the output format still hits the cache. The directory is kept
+    under `max_bytes` by evicting the least recently used entries; a hit refreshes
+    the entry's mtime, which is what the eviction order is based on.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def key(self, image, detection_prompt, model_id):
+        """Hash an RGB image (PIL or array) together with the prompt and model id."""
+        pixels = np.ascontiguousarray(np.asarray(image))
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{model_id}\0{detection_prompt}\0{pixels.shape}\0{pixels.dtype}\0".encode("utf-8"))
+        digest.update(pixels.data)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached raw bbox list for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                bboxes = json.load(f)["bboxes"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bboxes
+
+    def put(self, key, bboxes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"bboxes": bboxes}).encode("utf-8")
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+
+        # Write-then-rename so concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        self._size += len(data) - replaced
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction is not triggered on every put
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
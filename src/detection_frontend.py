@@ -0,0 +1,114 @@
+import math
+
+from PIL import Image
+
+# Images whose longer side is below this are never tiled; Florence-2 sees them well enough whole
+DEFAULT_TILE_MIN_SIDE = 1600
+
+
+def tile_windows(width, height, tiles, overlap):
+    """
+    Split a width x height image into a tiles x tiles grid of (x1, y1, x2, y2) windows.
+
+    Neighbouring windows share `overlap` (a fraction of the tile size), so a
+    watermark smaller than the overlap lies completely inside at least one tile.
+    """
+    windows = []
+    for axis_size in (width, height):
+        tile = math.ceil(axis_size / (tiles - (tiles - 1) * overlap))
+        step = (axis_size - tile) / (tiles - 1)
+        windows.append([(round(i * step), min(axis_size, round(i * step) + tile)) for i in range(tiles)])
+    return [(x1, y1, x2, y2) for y1, y2 in windows[1] for x1, x2 in windows[0]]
+
+
+def _iou(a, b):
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0, 0.0
+    inter = inter_w * inter_h
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    # IoU, and how much of the smaller box lies inside the other one
+    return inter / (area_a + area_b - inter), inter / max(1, min(area_a, area_b))
+
+
+def merge_bboxes(bboxes, iou_threshold=0.5, containment=0.8):
+    """
+    Non-maximum suppression for boxes without scores, largest box first.
+
+    A box that overlaps a kept box by `iou_threshold` IoU, or lies mostly inside it
+    (a watermark cut at a tile seam), is folded into that box by taking their
+    union, so the mask still covers both.
+    """
+    kept = []
+    for box in sorted(bboxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True):
+        for i, other in enumerate(kept):
+            iou, inside = _iou(box, other)
+            if iou >= iou_threshold or inside >= containment:
+                kept[i] = [min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])]
+                break
+        else:
+            kept.append(list(box))
+    return kept
+
+
+class DetectionFrontEnd:
+    """
+    Resolution-aware preparation of Florence-2 inputs.
+
+    The processor resizes every image to its fixed input size anyway, so a large
+    frame is first downscaled to `max_side` on its longer side (bilinear, much
+    cheaper than the processor's own resize of the full frame). With `tiles` > 1,
+    images whose longer side is at least `tile_min_side` are additionally cut into
+    a tiles x tiles grid of overlapping crops, so small logos keep enough pixels.
+    Detections of all views are mapped back to original coordinates and merged with
+    merge_bboxes(). None of this applies to images that need neither.
+    """
+
+    def __init__(self, max_side=None, tiles=1, overlap=0.2, tile_min_side=DEFAULT_TILE_MIN_SIDE):
+        self.max_side = max_side
+        self.tiles = tiles
+        self.overlap = overlap
+        self.tile_min_side = tile_min_side
+
+    @property
+    def signature(self):
+        """Stable description of the settings; part of detection cache keys and the manifest."""
+        return f"max_side={self.max_side},tiles={self.tiles},overlap={self.overlap},tile_min_side={self.tile_min_side}"
+
+    def __repr__(self):
+        return f"DetectionFrontEnd({self.signature})"
+
+    def _fit(self, image):
+        """Downscale `image` to max_side if needed; returns (image, scale)."""
+        longest = max(image.size)
+        if not self.max_side or longest <= self.max_side:
+            return image, 1.0
+        scale = self.max_side / longest
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return image.resize(size, Image.BILINEAR, reducing_gap=2.0), scale
+
+    def views(self, image):
+        """Return [(view_image, (offset_x, offset_y, scale)), ...] to send to Florence-2 for `image`."""
+        view, scale = self._fit(image)
+        views = [(view, (0, 0, scale))]
+        if self.tiles > 1 and max(image.size) >= self.tile_min_side:
+            for x1, y1, x2, y2 in tile_windows(image.width, image.height, self.tiles, self.overlap):
+                view, scale = self._fit(image.crop((x1, y1, x2, y2)))
+                views.append((view, (x1, y1, scale)))
+        return views
+
+    def merge(self, view_bboxes, transforms, image_size):
+        """Map per-view bboxes back to `image_size` coordinates and merge duplicates across views."""
+        width, height = image_size
+        bboxes = []
+        for boxes, (offset_x, offset_y, scale) in zip(view_bboxes, transforms):
+            for x1, y1, x2, y2 in boxes:
+                bboxes.append([
+                    max(0, math.floor(offset_x + x1 / scale)),
+                    max(0, math.floor(offset_y + y1 / scale)),
+                    min(width, math.ceil(offset_x + x2 / scale)),
+                    min(height, math.ceil(offset_y + y2 / scale)),
+                ])
+        return bboxes if len(transforms) == 1 else merge_bboxes(bboxes)
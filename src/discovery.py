@@ -0,0 +1,72 @@
+import os
+import queue
+import threading
+from pathlib import Path
+
+_END = object()
+
+
+def iter_files(root, predicate, exclude=None):
+    """
+    Recursively yield files under `root` accepted by `predicate`, as soon as they are found.
+
+    Directories are walked depth-first with os.scandir and entries are sorted per
+    directory, so the order is stable between runs. `exclude` (e.g. an output folder
+    nested inside the input folder) is never entered.
+    """
+    exclude = Path(exclude).resolve() if exclude is not None else None
+    stack = [Path(root)]
+    while stack:
+        directory = stack.pop()
+        if exclude is not None and directory.resolve() == exclude:
+            continue
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(Path(entry.path))
+                elif entry.is_file() and predicate(entry.name):
+                    yield Path(entry.path)
+            except OSError:
+                continue
+        # Reversed so the stack pops subdirectories in name order
+        stack.extend(reversed(subdirectories))
+
+
+class DirectoryScan:
+    """
+    Runs iter_files() on a background thread and hands out files as they are found.
+
+    Iterating blocks only until the next file is discovered, so processing starts on
+    the first file right away. `found` is the running total discovered so far and
+    `finished` turns True once the whole tree has been walked.
+    """
+
+    def __init__(self, root, predicate, exclude=None):
+        self.found = 0
+        self.finished = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._scan, args=(root, predicate, exclude), daemon=True)
+        self._thread.start()
+
+    def _scan(self, root, predicate, exclude):
+        try:
+            for path in iter_files(root, predicate, exclude):
+                self.found += 1
+                self._queue.put(path)
+        finally:
+            self.finished = True
+            self._queue.put(_END)
+
+    def __iter__(self):
+        while True:
+            path = self._queue.get()
+            if path is _END:
+                return
+            yield path
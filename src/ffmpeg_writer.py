@@ -0,0 +1,78 @@
+import shutil
+import subprocess
+import tempfile
+
+# Codecs that understand -crf and -preset; anything else uses ffmpeg's defaults
+CRF_CODECS = ("libx264", "libx265")
+DEFAULT_CODECS = {"MP4": "libx264", "AVI": "mpeg4"}
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+class FFmpegVideoWriter:
+    """
+    cv2.VideoWriter replacement that pipes raw BGR frames into a single ffmpeg process.
+
+    The audio of `audio_source` (if it has any) is muxed in the same pass, so there
+    is no intermediate silent video file and no second ffmpeg run.
+    """
+
+    def __init__(self, output_file, width, height, fps, audio_source=None, codec="libx264", crf=23, preset="medium"):
+        self.output_file = str(output_file)
+        self.frame_size = (height, width)
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}", "-r", f"{fps or 25}",
+            "-i", "-",
+        ]
+        if audio_source is not None:
+            command += ["-i", str(audio_source), "-map", "0:v:0", "-map", "1:a:0?", "-c:a", "aac", "-shortest"]
+        command += ["-c:v", codec]
+        if codec in CRF_CODECS:
+            command += ["-crf", str(crf), "-preset", preset]
+        if width % 2 or height % 2:
+            # yuv420p needs even dimensions
+            command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        command += ["-pix_fmt", "yuv420p", self.output_file]
+
+        # ffmpeg's stderr goes to a file so a chatty encoder can never block the pipe
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def _error_output(self):
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", errors="replace").strip()
+
+    def write(self, frame):
+        if frame.shape[:2] != self.frame_size:
+            raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} does not match the video size")
+        try:
+            self.process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            self.process.wait()
+            raise RuntimeError(f"ffmpeg exited while encoding {self.output_file}: {self._error_output()}")
+
+    def release(self):
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.process.wait()
+        error_output = self._error_output()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {returncode}: {error_output}")
+
+    def abort(self):
+        """Stop ffmpeg without finishing the video; for when processing failed midway."""
+        self.process.kill()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self._stderr.close()
@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+
+from src.roi import mask_regions
+
+HD_STRATEGIES = ("auto", "crop", "resize", "original")
+
+
+class LamaConfig:
+    """
+    LaMa high-resolution strategy, with the iopaint request built once per strategy.
+
+    iopaint's strategies, for images whose longer side exceeds the trigger/limit:
+      crop     - inpaint a `crop_margin` padded crop around every mask region
+      resize   - inpaint a copy downscaled to `resize_limit` and paste the masked pixels back
+      original - inpaint the full image at full resolution
+    "auto" picks one per image: original when the image is no larger than
+    `crop_trigger` (nothing to save), crop while the padded crops cover at most
+    `crop_coverage` of the image (small logos on large frames), and otherwise
+    resize, or original when the image is within `resize_limit` anyway.
+    """
+
+    def __init__(self, strategy="crop", crop_margin=64, crop_trigger=800, resize_limit=1600, crop_coverage=0.35):
+        if strategy not in HD_STRATEGIES:
+            raise ValueError(f"strategy must be one of {', '.join(HD_STRATEGIES)}, got {strategy}")
+        self.strategy = strategy
+        self.crop_margin = crop_margin
+        self.crop_trigger = crop_trigger
+        self.resize_limit = resize_limit
+        self.crop_coverage = crop_coverage
+        self.counts = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled; a --workers process gets its own
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_requests"] = {}  # Rebuilt on first use
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def take_counts(self):
+        """Return `counts` and start over from zero; how --workers processes report them per file."""
+        with self._lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+    def __repr__(self):
+        # Stable across runs; the --incremental manifest hashes it
+        return (f"LamaConfig(strategy={self.strategy}, crop_margin={self.crop_margin}, crop_trigger={self.crop_trigger}, "
+                f"resize_limit={self.resize_limit}, crop_coverage={self.crop_coverage})")
+
+    def select(self, image, mask):
+        """HD strategy ("crop", "resize" or "original") used for this image and mask."""
+        if self.strategy != "auto":
+            return self.strategy
+        height, width = image.shape[:2]
+        longest = max(height, width)
+        if longest <= self.crop_trigger:
+            return "original"
+        crop_pixels = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in mask_regions(np.asarray(mask), self.crop_margin))
+        if crop_pixels <= self.crop_coverage * height * width:
+            return "crop"
+        return "resize" if longest > self.resize_limit else "original"
+
+    def record(self, image, mask):
+        """select() and count the strategy in `counts`; for LaMa runs that bypass request()."""
+        strategy = self.select(image, mask)
+        with self._lock:
+            self.counts[strategy] = self.counts.get(strategy, 0) + 1
+        return strategy
+
+    def request(self, image, mask, count=True):
+        """
+        The iopaint InpaintRequest for this image and mask; one shared object per strategy.
+
+        With count=False the strategy is not counted, for work that was already
+        recorded for the frame it belongs to.
+        """
+        strategy = self.record(image, mask) if count else self.select(image, mask)
+        with self._lock:
+            request = self._requests.get(strategy)
+            if request is None:
+                from iopaint.schema import HDStrategy, InpaintRequest
+
+                request = self._requests[strategy] = InpaintRequest(
+                    hd_strategy=HDStrategy[strategy.upper()],
+                    hd_strategy_crop_margin=self.crop_margin,
+                    hd_strategy_crop_trigger_size=self.crop_trigger,
+                    hd_strategy_resize_limit=self.resize_limit,
+                )
+        return request
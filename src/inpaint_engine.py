@@ -0,0 +1,125 @@
+import threading
+
+import numpy as np
+
+from src.lazy import lazy_module
+from src.profiling import stage_timer
+
+cv2 = lazy_module("cv2")
+
+INPAINT_ENGINES = ("lama", "telea", "ns", "auto")
+
+
+class InpaintEngine:
+    """
+    Chooses between LaMa and OpenCV's classical inpainting for each mask region.
+
+    telea/ns send every region to cv2.inpaint (no model needed). auto keeps LaMa
+    for the regions where it matters and uses Telea for the rest: a region goes
+    to Telea when it covers at most `max_area` pixels and the background in a
+    `ring` pixel band around it is flat, i.e. its mean absolute Laplacian is at
+    most `max_texture`. Thin text over flat colour or smooth gradients passes,
+    logos over detailed footage do not. `counts` tracks regions per engine.
+    """
+
+    def __init__(self, engine="auto", max_area=20000, max_texture=4.0, ring=8, radius=3):
+        if engine not in INPAINT_ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(INPAINT_ENGINES)}, got {engine}")
+        self.engine = engine
+        self.max_area = max_area
+        self.max_texture = max_texture
+        self.ring = ring
+        self.radius = radius
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled; a --workers process gets its own
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def take_counts(self):
+        """Return `counts` and start over from zero; how --workers processes report them per file."""
+        with self._lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+    def __repr__(self):
+        # Stable across runs; the --incremental manifest hashes it
+        return (f"InpaintEngine(engine={self.engine}, max_area={self.max_area}, max_texture={self.max_texture}, "
+                f"ring={self.ring}, radius={self.radius})")
+
+    @property
+    def uses_lama(self):
+        return self.engine in ("lama", "auto")
+
+    def _texture(self, gray, region, x1, y1, x2, y2):
+        height, width = gray.shape
+        rx1, ry1 = max(0, x1 - self.ring), max(0, y1 - self.ring)
+        rx2, ry2 = min(width, x2 + self.ring), min(height, y2 + self.ring)
+        window = gray[ry1:ry2, rx1:rx2]
+        inside = np.zeros(window.shape, dtype=np.uint8)
+        inside[y1 - ry1:y2 - ry1, x1 - rx1:x2 - rx1] = region
+        # The Laplacian still responds to the watermark's own edge just outside it, so skip 2 px
+        ring = cv2.dilate(inside, np.ones((5, 5), np.uint8)) == 0
+        if not ring.any():
+            return float("inf")
+        return float(np.abs(cv2.Laplacian(window, cv2.CV_32F))[ring].mean())
+
+    def choose(self, gray, region, x1, y1, x2, y2):
+        """Engine for one region: a boolean mask of the window (x1, y1, x2, y2) of a gray frame."""
+        if self.engine != "auto":
+            return self.engine
+        if int(region.sum()) > self.max_area:
+            return "lama"
+        return "telea" if self._texture(gray, region, x1, y1, x2, y2) <= self.max_texture else "lama"
+
+    def split(self, image, mask):
+        """
+        Split `mask` by engine for an RGB `image`.
+
+        Returns (lama_mask, classical) where lama_mask keeps the LaMa regions and
+        classical maps "telea"/"ns" to masks of the regions for that engine.
+        """
+        mask = np.asarray(mask)
+        binary = (mask > 0).astype(np.uint8)
+        if self.engine in ("telea", "ns"):
+            regions = cv2.connectedComponents(binary, connectivity=8)[0] - 1
+            self._count(self.engine, regions)
+            return np.zeros_like(mask), {self.engine: mask} if regions else {}
+        if self.engine == "lama":
+            return mask, {}
+
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        lama_mask = mask.copy()
+        classical = {}
+        for label in range(1, count):  # label 0 is the background
+            x, y, w, h = map(int, stats[label, :4])
+            region = labels[y:y + h, x:x + w] == label
+            engine = self.choose(gray, region, x, y, x + w, y + h)
+            self._count(engine, 1)
+            if engine == "lama":
+                continue
+            engine_mask = classical.setdefault(engine, np.zeros_like(mask))
+            engine_mask[y:y + h, x:x + w][region] = 255
+            lama_mask[y:y + h, x:x + w][region] = 0
+        return lama_mask, classical
+
+    def inpaint_classical(self, result, classical):
+        """Inpaint the `classical` masks of split() into the BGR `result`; returns the new BGR image."""
+        for engine, engine_mask in classical.items():
+            flag = cv2.INPAINT_TELEA if engine == "telea" else cv2.INPAINT_NS
+            with stage_timer.stage("inpaint"):
+                result = cv2.inpaint(result, (engine_mask > 0).astype(np.uint8) * 255, self.radius, flag)
+        return result
+
+    def _count(self, engine, regions):
+        if regions:
+            with self._lock:
+                self.counts[engine] = self.counts.get(engine, 0) + regions
@@ -0,0 +1,95 @@
+import numpy as np
+
+from src.lazy import lazy_module
+from src.profiling import stage_timer
+
+cv2 = lazy_module("cv2")
+
+
+def lama_network(model_manager):
+    """The TorchScript LaMa network inside an iopaint ModelManager and its device, or None."""
+    model = getattr(model_manager, "model", None)
+    if getattr(model, "name", None) != "lama" or getattr(model, "model", None) is None:
+        return None
+    return model.model, model.device
+
+
+def _pad_to(array, height, width):
+    # Same padding iopaint uses to reach LaMa's size multiple: mirrored, bottom/right
+    pad = ((0, height - array.shape[0]), (0, width - array.shape[1])) + ((0, 0),) * (array.ndim - 2)
+    return np.pad(array, pad, mode="symmetric")
+
+
+class LamaBatcher:
+    """
+    Runs LaMa on many image/mask crops with one forward pass per batch.
+
+    Crops are grouped into size buckets (height and width rounded up to `bucket`
+    pixels) and padded to their bucket's size, so identically sized crops, as
+    with a watermark at a fixed position, always batch together and slightly
+    different ones usually do. Each bucket is run in chunks of up to
+    `batch_size`, and the results are returned in input order. Like iopaint,
+    only the masked pixels are taken from the network output.
+
+    When `model_manager` does not hold a LaMa network that can be called
+    directly, every crop goes through `fallback(image, mask)` one at a time.
+    """
+
+    def __init__(self, model_manager, batch_size=8, bucket=32, fallback=None):
+        self.network = lama_network(model_manager)
+        self.batch_size = max(1, batch_size)
+        self.bucket = bucket
+        self.fallback = fallback
+        self.crops = 0
+        self.forward_calls = 0
+
+    @property
+    def available(self):
+        return self.network is not None
+
+    def _forward(self, images, masks):
+        """LaMa over a uint8 (N, H, W, 3) RGB batch and (N, H, W) masks; returns uint8 RGB."""
+        import torch
+
+        network, device = self.network
+        image_tensor = torch.from_numpy(np.ascontiguousarray(images.transpose(0, 3, 1, 2))).to(device).float() / 255
+        mask_tensor = torch.from_numpy((masks > 0).astype(np.float32)[:, None]).to(device)
+        with torch.no_grad():
+            output = network(image_tensor, mask_tensor)
+        output = output.permute(0, 2, 3, 1).detach().cpu().numpy()
+        return np.clip(output * 255, 0, 255).astype(np.uint8)
+
+    def inpaint(self, crops):
+        """
+        Inpaint a list of (rgb_image, mask) crops.
+
+        Returns one BGR uint8 result per crop, the same size as the crop, in order.
+        """
+        results = [None] * len(crops)
+        self.crops += len(crops)
+        if not self.available:
+            for i, (image, mask) in enumerate(crops):
+                results[i] = self.fallback(image, mask)
+            return results
+
+        buckets = {}
+        for i, (image, mask) in enumerate(crops):
+            height, width = image.shape[:2]
+            key = (-(-height // self.bucket) * self.bucket, -(-width // self.bucket) * self.bucket)
+            buckets.setdefault(key, []).append(i)
+
+        for (height, width), indices in buckets.items():
+            for start in range(0, len(indices), self.batch_size):
+                chunk = indices[start:start + self.batch_size]
+                images = np.stack([_pad_to(crops[i][0], height, width) for i in chunk])
+                masks = np.stack([_pad_to(crops[i][1], height, width) for i in chunk])
+                with stage_timer.stage("inpaint"):
+                    outputs = self._forward(images, masks)
+                self.forward_calls += 1
+                for i, output in zip(chunk, outputs):
+                    image, mask = crops[i]
+                    output = output[:image.shape[0], :image.shape[1]]
+                    keep = mask < 127
+                    output[keep] = image[keep]
+                    results[i] = cv2.cvtColor(output, cv2.COLOR_RGB2BGR)
+        return results
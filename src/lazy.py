@@ -0,0 +1,23 @@
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in that imports the real module on first attribute access."""
+
+    def __getattr__(self, name):
+        module = importlib.import_module(self.__name__)
+        # Copy the real attributes over so later lookups no longer go through here
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+def lazy_module(name):
+    """
+    Return a placeholder for module `name` that is only imported when first used.
+
+    `cv2 = lazy_module("cv2")` at the top of a module keeps the import off the
+    startup path (--help, argument errors, skipped files) without touching the
+    code that calls cv2.
+    """
+    return _LazyModule(name)
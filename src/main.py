@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import tempfile
 from pathlib import Path
 
 # Determine if running as part of a PyInstaller bundle
@@ -42,8 +43,9 @@ from PySide6.QtWidgets import (
     QLabel,
     QProgressBar,
 )
-from PySide6.QtCore import QProcess, Qt, QStandardPaths
+from PySide6.QtCore import QProcess, QProcessEnvironment, Qt, QStandardPaths, QTimer
 import src.worker as worker  # Import worker module
+from src.metrics import METRICS_FILE_ENV
 
 
 class MainWindow(QMainWindow):
@@ -119,6 +121,17 @@ class MainWindow(QMainWindow):
         self.process = QProcess()
         self.process.setProcessChannelMode(QProcess.MergedChannels)
 
+        # The worker writes JSON-lines metrics to this file; progress is read from it
+        self.metrics_path = os.path.join(
+            tempfile.gettempdir(), f"remwm_metrics_{os.getpid()}.jsonl"
+        )
+        self.metrics_offset = 0
+        self.metrics_buffer = ""
+        self.current_stage = ""
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(250)
+        self.metrics_timer.timeout.connect(self.poll_metrics)
+
         # Connect signals
         self.watermark_mask_deleted_browse_button.clicked.connect(
             lambda: self.open_file_dialog(
@@ -249,6 +262,16 @@ class MainWindow(QMainWindow):
         )
         # --- END DEBUGGING ---
 
+        # Start every run with an empty metrics file
+        open(self.metrics_path, "w").close()
+        self.metrics_offset = 0
+        self.metrics_buffer = ""
+        self.current_stage = ""
+        environment = QProcessEnvironment.systemEnvironment()
+        environment.insert(METRICS_FILE_ENV, self.metrics_path)
+        self.process.setProcessEnvironment(environment)
+        self.metrics_timer.start()
+
         self.process.start(python_executable, worker_process_args)
 
     def handle_stdout(self):
@@ -256,19 +279,50 @@ class MainWindow(QMainWindow):
         stdout = data.data().decode("utf-8").strip()
         self.log_display.append(stdout)
 
-        # Check for progress updates
-        if stdout.startswith("PROGRESS:"):
+    def poll_metrics(self):
+        """Read the metrics events the worker appended since the last poll."""
+        try:
+            with open(self.metrics_path, "r", encoding="utf-8") as f:
+                f.seek(self.metrics_offset)
+                chunk = f.read()
+                self.metrics_offset = f.tell()
+        except OSError:
+            return
+
+        # Keep a trailing partial line for the next poll
+        lines = (self.metrics_buffer + chunk).split("\n")
+        self.metrics_buffer = lines.pop()
+        for line in lines:
             try:
-                progress_value = int(stdout.split(":")[1])
-                self.update_progress_bar(progress_value)
+                event = json.loads(line)
             except ValueError:
-                pass  # Ignore malformed progress messages
-        elif stdout.startswith("STAGE:"):
+                continue  # Ignore malformed lines
+            self.handle_metrics_event(event)
+
+    def handle_metrics_event(self, event):
+        kind = event.get("event")
+        if kind == "stage":
+            self.current_stage = event.get("name", "")
+            self.progress_label.setText(self.current_stage)
+        elif kind == "progress":
+            if event.get("percent") is not None:
+                self.update_progress_bar(int(event["percent"]))
+            details = [f"{event.get('done')}/{event.get('total')}"]
+            if event.get("fps"):
+                details.append(f"{event['fps']:.1f} fps")
+            if event.get("eta_seconds") is not None:
+                details.append(f"ETA {int(event['eta_seconds'])}s")
             self.progress_label.setText(
-                stdout[6:].strip()
-            )  # Update progress label with stage message
+                " - ".join(filter(None, [self.current_stage, ", ".join(details)]))
+            )
+        elif kind == "end" and event.get("seconds") is not None:
+            self.log_display.append(
+                f"Worker {event.get('status')} in {event['seconds']:.1f}s, stage times: {event.get('stages')}"
+            )
 
     def handle_finished(self, exit_code, exit_status):
+        self.metrics_timer.stop()
+        self.poll_metrics()
         status = "finished" if exit_status == QProcess.NormalExit else "crashed"
         self.log_display.append(f"Process {status} with exit code: {exit_code}.")
         self.start_button.setEnabled(True)
@@ -278,6 +332,7 @@ class MainWindow(QMainWindow):
         )  # Clear progress label or set to finished
 
     def handle_error(self, error):
+        self.metrics_timer.stop()
         self.log_display.append(f"An error occurred: {error.name}")
         self.start_button.setEnabled(True)
         self.progress_bar.setValue(0)  # Reset on error
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+MANIFEST_NAME = ".remwm-manifest.json"
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_digest(params):
+    """Hash the options that change the output; key order does not matter."""
+    data = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class Manifest:
+    """
+    Per-output-directory record of what was built from which input.
+
+    Each entry stores the input's content hash, the hash of the output-affecting
+    parameters and the output path (relative to the output directory). A file is
+    current when all three still match, so a rerun only processes new or changed
+    inputs, like an incremental build. Inputs whose size and mtime are unchanged
+    reuse the recorded hash instead of being read again.
+    """
+
+    def __init__(self, output_dir, input_root, params, save_interval=5.0):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.input_root = Path(input_root)
+        self.params_hash = params_digest(params)
+        self.save_interval = save_interval
+        self.skipped = 0
+        self._last_save = time.monotonic()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+
+    def _key(self, input_path):
+        return Path(input_path).relative_to(self.input_root).as_posix()
+
+    def _input_state(self, input_path, entry=None):
+        stat = os.stat(input_path)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            input_hash = entry["input_hash"]
+        else:
+            input_hash = file_digest(input_path)
+        return {"input_hash": input_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_current(self, input_path):
+        """True when `input_path` was already processed with the same content and parameters."""
+        entry = self.entries.get(self._key(input_path))
+        if not entry or entry.get("params_hash") != self.params_hash:
+            return False
+        if not (self.path.parent / entry["output"]).exists():
+            return False
+        try:
+            current = self._input_state(input_path, entry)
+        except OSError:
+            return False
+        if current["input_hash"] != entry["input_hash"]:
+            return False
+        # Content unchanged but touched: remember the new mtime so the next run skips the hash
+        entry.update(current)
+        self.skipped += 1
+        return True
+
+    def record(self, input_path, output_path):
+        key = self._key(input_path)
+        entry = self._input_state(input_path, self.entries.get(key))
+        entry["params_hash"] = self.params_hash
+        entry["output"] = os.path.relpath(output_path, self.path.parent)
+        self.entries[key] = entry
+        # Saved periodically rather than per file so huge directories stay linear
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        data = json.dumps({"files": self.entries}, indent=1, sort_keys=True)
+        # Write-then-rename so an interrupted run never leaves a truncated manifest
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+        self._last_save = time.monotonic()
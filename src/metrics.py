@@ -0,0 +1,179 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+from src.profiling import stage_timer
+
+# Environment variable the GUI uses to hand the worker processes a metrics file
+METRICS_FILE_ENV = "REMWM_METRICS_FILE"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where it cannot be read."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return None
+            return counters.PeakWorkingSetSize
+
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError, AttributeError):
+        return None
+
+
+class MetricsEmitter:
+    """
+    JSON-lines metrics channel for the GUI and for monitoring.
+
+    Every line is one JSON object with an "event" field:
+      start     - a job begins
+      stage     - a named processing phase begins
+      progress  - done/total for a scope ("video", "pass1", "pass2", "files", ...),
+                  with percent, fps, eta_seconds, queue_depths, per-stage busy
+                  seconds and peak_rss_bytes
+      file_done - one input finished
+      end       - the job finished, with the final stage totals
+    Progress events are rate-limited to one per `interval` seconds per scope, but
+    the last one of a scope (done == total) is always written. Until open() is
+    called every method is a no-op, so the processing code can call it freely.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._stream = None
+        self._lock = threading.Lock()
+        self._job_started = None
+        self._scopes = {}  # scope -> [start_time, start_done, last_done, last_emit]
+
+    @property
+    def enabled(self):
+        return self._stream is not None
+
+    def open(self, target):
+        """Start writing to a file descriptor (int) or appending to a file path (str)."""
+        self.close()
+        if isinstance(target, int):
+            self._stream = os.fdopen(target, "w", buffering=1, encoding="utf-8", closefd=False)
+        else:
+            self._stream = open(target, "a", buffering=1, encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def emit(self, event, **fields):
+        if self._stream is None:
+            return
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields}, default=str)
+        with self._lock:
+            if self._stream is not None:
+                self._stream.write(line + "\n")
+                self._stream.flush()
+
+    def relay(self, line):
+        """Write an event line emitted by another process (a --serve instance running our job) as is."""
+        with self._lock:
+            if self._stream is not None:
+                self._stream.write(line)
+                self._stream.flush()
+
+    @contextlib.contextmanager
+    def forward(self, stream):
+        """Send all events to `stream` (anything with write/flush) instead, for the duration of the block."""
+        with self._lock:
+            previous, self._stream = self._stream, stream
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stream = previous
+
+    def _stage_seconds(self):
+        return {name: round(totals["seconds"], 4) for name, totals in stage_timer.snapshot().items()}
+
+    def start(self, **fields):
+        self._job_started = time.perf_counter()
+        self._scopes.clear()
+        self.emit("start", pid=os.getpid(), **fields)
+
+    def stage(self, name, **fields):
+        self.emit("stage", name=name, **fields)
+
+    def progress(self, scope, done, total, percent=None, queue_depths=None, **fields):
+        if self._stream is None:
+            return
+        now = time.perf_counter()
+        state = self._scopes.get(scope)
+        if state is None or done < state[2]:
+            # New scope, or the same scope restarted (e.g. the next video)
+            state = self._scopes[scope] = [now, done, done, 0.0]
+        state[2] = done
+        finished = total is not None and done >= total
+        if not finished and now - state[3] < self.interval:
+            return
+        state[3] = now
+
+        elapsed = now - state[0]
+        fps = (done - state[1]) / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / fps if fps > 0 and total is not None else None
+        if percent is None and total:
+            percent = 100.0 * done / total
+        self.emit(
+            "progress",
+            scope=scope,
+            done=done,
+            total=total,
+            percent=round(percent, 2) if percent is not None else None,
+            fps=round(fps, 3),
+            eta_seconds=round(eta, 1) if eta is not None else None,
+            queue_depths=queue_depths,
+            stages=self._stage_seconds(),
+            peak_rss_bytes=peak_rss_bytes(),
+            **fields,
+        )
+
+    def file_done(self, input_path, output_path, **fields):
+        self.emit("file_done", input=str(input_path), output=str(output_path) if output_path else None, **fields)
+
+    def finish(self, status="ok", **fields):
+        seconds = time.perf_counter() - self._job_started if self._job_started is not None else None
+        self.emit(
+            "end",
+            status=status,
+            seconds=round(seconds, 3) if seconds is not None else None,
+            stages=self._stage_seconds(),
+            peak_rss_bytes=peak_rss_bytes(),
+            **fields,
+        )
+
+
+# Shared by the processing code; configured once per process from the CLI or environment
+metrics = MetricsEmitter()
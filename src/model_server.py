@@ -0,0 +1,246 @@
+import contextlib
+import hmac
+import json
+import os
+import re
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+
+from loguru import logger
+
+from src.metrics import metrics
+
+_TCP_ADDRESS = re.compile(r"^[^/\\]*:\d+$")
+
+
+def default_server_address():
+    """
+    A Unix socket in a directory only this user can enter, where the platform has
+    them; otherwise localhost TCP, which is protected by a token file instead.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return "127.0.0.1:5757"
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "remwm")
+    return os.path.join(runtime_dir, "remwm-server.sock")
+
+
+DEFAULT_SERVER_ADDRESS = default_server_address()
+
+
+def is_tcp_address(address):
+    """True for "host:port", False for a Unix socket path."""
+    return bool(_TCP_ADDRESS.match(address))
+
+
+def parse_address(address):
+    """Split "host:port" into a (host, port) tuple."""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def token_path(address):
+    """File holding the shared secret of a TCP server; readable by its user only."""
+    _, port = parse_address(address)
+    return os.path.join(os.path.expanduser("~"), ".remwm", f"server-{port}.token")
+
+
+def _write_token(path):
+    token = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    # Created with owner-only permissions, never world-readable in between
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def _read_token(address):
+    try:
+        with open(token_path(address), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _send(wfile, message, lock=None):
+    data = (json.dumps(message) + "\n").encode("utf-8")
+    with lock or contextlib.nullcontext():
+        wfile.write(data)
+        wfile.flush()
+
+
+class _Forwarded:
+    """
+    File-like object that streams what a job writes to the client as {key: text} lines.
+
+    stdout and the metrics channel share one connection and `lock`, so lines
+    written from different pipeline threads never interleave.
+    """
+
+    def __init__(self, wfile, key, lock):
+        self.wfile = wfile
+        self.key = key
+        self.lock = lock
+
+    def write(self, text):
+        if text:
+            _send(self.wfile, {self.key: text}, self.lock)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class _JobServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+def _bind_unix_server(path, handler):
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError(f"Unix sockets are not available on this platform, use host:port instead of {path}")
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        # A socket file nobody answers on is left over from a server that died
+        with socket.socket(socket.AF_UNIX) as probe:
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)
+            else:
+                raise OSError(f"A model server is already listening on {path}")
+    # Owner-only from the moment the socket file exists
+    old_umask = os.umask(0o177)
+    try:
+        return socketserver.UnixStreamServer(path, handler)
+    finally:
+        os.umask(old_umask)
+
+
+def serve(address, run_job):
+    """
+    Serve jobs until a "shutdown" command arrives.
+
+    `address` is a Unix socket path (the default where available), which only
+    this user can connect to, or "host:port" for TCP. A TCP server writes a
+    random token to token_path(address) and only accepts requests that carry
+    it as "token"; send_command() reads it from there.
+
+    Each connection sends one JSON line ({"command": "run", "params": {...}}) and
+    receives the job's stdout as {"stdout": ...} lines followed by a final
+    {"status": "ok"|"error"} line. With "metrics": true in the request, the job's
+    metrics events are sent along as {"metrics": ...} lines instead of going to
+    the server's own metrics channel. Jobs run one at a time on the serving
+    thread, so the loaded models are never used concurrently.
+    """
+    token = _write_token(token_path(address)) if is_tcp_address(address) else None
+
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            # Any reply, including the final status, can find the client already gone
+            try:
+                self._handle()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.warning("Client disconnected before reading the reply")
+
+        def _handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+            except ValueError as e:
+                _send(self.wfile, {"status": "error", "error": f"Malformed request: {e}"})
+                return
+            if token is not None and not hmac.compare_digest(str(request.get("token", "")), token):
+                logger.warning("Rejected a request without a valid token")
+                _send(self.wfile, {"status": "error", "error": "Invalid or missing server token"})
+                return
+
+            command = request.get("command")
+            if command == "ping":
+                _send(self.wfile, {"status": "ok"})
+            elif command == "shutdown":
+                _send(self.wfile, {"status": "ok"})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif command == "run":
+                params = request.get("params", {})
+                logger.info(f"Running job for {params.get('input_path')}")
+                lock = threading.Lock()
+                forward_metrics = metrics.forward(_Forwarded(self.wfile, "metrics", lock)) if request.get("metrics") else contextlib.nullcontext()
+                try:
+                    with contextlib.redirect_stdout(_Forwarded(self.wfile, "stdout", lock)), forward_metrics:
+                        run_job(params)
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.warning("Client disconnected before the job finished")
+                    return
+                except Exception as e:
+                    logger.exception("Job failed")
+                    _send(self.wfile, {"status": "error", "error": str(e)})
+                    return
+                _send(self.wfile, {"status": "ok"})
+            else:
+                _send(self.wfile, {"status": "error", "error": f"Unknown command: {command}"})
+
+    if token is None:
+        try:
+            with _bind_unix_server(address, JobHandler) as server:
+                logger.info(f"Model server listening on {address}")
+                server.serve_forever()
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(address)
+        return
+
+    host, port = parse_address(address)
+    try:
+        with _JobServer((host, port), JobHandler) as server:
+            logger.info(f"Model server listening on {host}:{port}")
+            server.serve_forever()
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(token_path(address))
+
+
+def send_command(address, request, out=None, connect_timeout=2.0, on_metrics=None):
+    """
+    Send one request to a running server and relay its stdout to `out`.
+
+    Forwarded metrics lines are passed to `on_metrics`. Returns the final status
+    message, or None if no server is listening.
+    """
+    out = out or sys.stdout
+    try:
+        if is_tcp_address(address):
+            request = {**request, "token": _read_token(address)}
+            sock = socket.create_connection(parse_address(address), timeout=connect_timeout)
+        else:
+            sock = socket.socket(socket.AF_UNIX)
+            sock.settimeout(connect_timeout)
+            try:
+                sock.connect(address)
+            except OSError:
+                sock.close()
+                raise
+    except (OSError, AttributeError):
+        # AttributeError: no AF_UNIX on this platform
+        return None
+
+    with sock:
+        # Jobs can take arbitrarily long once the server has accepted them
+        sock.settimeout(None)
+        with sock.makefile("rwb") as stream:
+            _send(stream, request)
+            for line in stream:
+                message = json.loads(line)
+                if "stdout" in message:
+                    out.write(message["stdout"])
+                    out.flush()
+                elif "metrics" in message:
+                    if on_metrics is not None:
+                        on_metrics(message["metrics"])
+                else:
+                    return message
+    return {"status": "error", "error": "Server closed the connection before the job finished"}
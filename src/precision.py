@@ -0,0 +1,48 @@
+from contextlib import nullcontext
+
+from loguru import logger
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+# Attribute stored on the loaded model, so inference and the detection cache can tell the mode apart
+_PRECISION_ATTR = "remwm_precision"
+
+
+def apply_precision(model, precision, device):
+    """
+    Prepare a loaded Florence-2 model for inference at `precision`.
+
+      fp32 - unchanged
+      bf16 - weights stay fp32; generate() runs under bfloat16 autocast (see inference_precision)
+      int8 - dynamic int8 quantization of every nn.Linear, which covers the language model
+             and the vision encoder; weights are quantized once here, activations per call
+
+    int8 is CPU only: on other devices it falls back to fp32 with a warning.
+    Returns the model to use (quantization builds a new module).
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {', '.join(PRECISIONS)}, got {precision}")
+
+    import torch
+
+    if precision == "int8":
+        if device != "cpu":
+            logger.warning(f"int8 precision is only supported on CPU, using fp32 on {device}")
+            precision = "fp32"
+        else:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    setattr(model, _PRECISION_ATTR, precision)
+    return model
+
+
+def model_precision(model):
+    """Precision a model was prepared with by apply_precision() (fp32 for anything else)."""
+    return getattr(model, _PRECISION_ATTR, "fp32")
+
+
+def inference_precision(model, device):
+    """Context manager to wrap the model's forward/generate calls in."""
+    if model_precision(model) != "bf16":
+        return nullcontext()
+    import torch
+    return torch.autocast(device_type="cuda" if str(device).startswith("cuda") else "cpu", dtype=torch.bfloat16)
@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Accumulates wall time per processing stage (decode, detect, mask, inpaint, encode, mux).
+
+    Stages of the video pipeline run on their own threads, so the totals are busy
+    time per stage and can add up to more than the elapsed time of a run. Timing a
+    block costs two perf_counter() calls, cheap enough to stay on all the time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = defaultdict(float)
+        self._calls = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._seconds[name] += elapsed
+                self._calls[name] += 1
+
+    def snapshot(self):
+        """Return {stage: {"seconds": float, "calls": int}} for everything timed so far."""
+        with self._lock:
+            return {name: {"seconds": self._seconds[name], "calls": self._calls[name]} for name in self._seconds}
+
+    def reset(self):
+        with self._lock:
+            self._seconds.clear()
+            self._calls.clear()
+
+
+# Shared by the processing code; benchmarks reset and read it around each run
+stage_timer = StageTimer()
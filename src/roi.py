@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.lazy import lazy_module
+
+cv2 = lazy_module("cv2")
+
+
+def _merge_overlapping(boxes):
+    """Merge (x1, y1, x2, y2) boxes until no two of them overlap."""
+    boxes = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def mask_regions(mask, padding=64, union=False):
+    """
+    Return padded crop windows (x1, y1, x2, y2) covering every connected mask region.
+
+    Windows are clipped to the frame and merged when their padding overlaps, so no
+    pixel is inpainted twice. With `union=True` a single window around all regions
+    is returned instead. An empty mask yields no windows.
+    """
+    mask = np.asarray(mask)
+    height, width = mask.shape[:2]
+    binary = (mask > 0).astype(np.uint8)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    boxes = []
+    for label in range(1, count):  # label 0 is the background
+        x, y, w, h = map(int, stats[label, :4])
+        boxes.append((
+            max(0, x - padding),
+            max(0, y - padding),
+            min(width, x + w + padding),
+            min(height, y + h + padding),
+        ))
+
+    if not boxes:
+        return []
+    if union:
+        return [(min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))]
+    return _merge_overlapping(boxes)
@@ -0,0 +1,168 @@
+import numpy as np
+
+from src.lazy import lazy_module
+
+cv2 = lazy_module("cv2")
+
+
+def default_scales(min_scale=0.5, max_scale=2.0, step=1.1):
+    """Geometric ladder of template scales from min_scale to max_scale, always including 1.0."""
+    down = [1.0 / step ** i for i in range(1, 64) if 1.0 / step ** i >= min_scale]
+    up = [step ** i for i in range(1, 64) if step ** i <= max_scale]
+    return sorted(down + [1.0] + up)
+
+
+class TemplateLocator:
+    """
+    Finds the worker's watermark template in each frame and moves its mask there.
+
+    `mask` is the thresholded template mask and `appearance` the grayscale pixels
+    of the template PNG. With `masked=True` (the PNG has an alpha channel) only
+    the pixels under the mask are compared, so the logo's own colours are
+    matched; otherwise the silhouette itself is the template. A mask with the
+    frame's size also gives the logo's original position, which seeds the
+    first search and stays in use while the logo is not found anywhere.
+
+    Each frame is first searched in a window `search_margin` pixels around the
+    previous match (or the original position), at its scale and the two
+    neighbouring `scales`. A match needs a TM_CCOEFF_NORMED score of at least
+    `threshold`. When that fails, the whole frame is searched: first on a copy
+    downscaled to `coarse_side` at every other scale, then at full resolution
+    around the best coarse hit. Full searches run on the first frame that needs
+    one and then at most once every `rescan_interval` frames, so a logo that is
+    not there costs one full search per interval; in between, the last known
+    position is kept.
+    """
+
+    def __init__(self, mask, appearance, masked=False, frame_size=None, scales=None, search_margin=48, threshold=0.6,
+                 rescan_interval=15, coarse_side=640):
+        self.scales = scales or default_scales()
+        self.search_margin = search_margin
+        self.threshold = threshold
+        self.rescan_interval = rescan_interval
+        self.coarse_side = coarse_side
+        self.frames = 0
+        self.located = 0
+        self.lost = 0
+        self.full_searches = 0
+
+        ys, xs = np.nonzero(mask)
+        self.active = len(xs) > 0
+        if not self.active:
+            return
+        x1, y1, x2, y2 = int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+        self.shape = mask[y1:y2, x1:x2].copy()
+        self.template = appearance[y1:y2, x1:x2].copy()
+        self.match_mask = self.shape.copy() if masked and self.template[self.shape > 0].std() >= 1.0 else None
+        # (x, y, scale) of the template in frame coordinates
+        self.origin = (x1, y1, 1.0) if frame_size is not None and tuple(mask.shape[:2]) == tuple(frame_size) else None
+        self.match = None
+        self._next_full_search = 0
+        self._cache = (None, None, None)
+
+    def _scaled(self, scale):
+        height, width = self.template.shape[:2]
+        size = (max(2, round(width * scale)), max(2, round(height * scale)))
+        template = cv2.resize(self.template, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        shape = cv2.resize(self.shape, size, interpolation=cv2.INTER_NEAREST)
+        return template, shape
+
+    def _search(self, gray, window, scales, factor=1.0):
+        """
+        Best (score, x, y, scale) of the template inside window (x1, y1, x2, y2) over `scales`.
+
+        `gray` may be the frame downscaled by `factor`; the template is scaled to
+        match and x, y are in `gray`'s coordinates.
+        """
+        wx1, wy1, wx2, wy2 = window
+        region = gray[wy1:wy2, wx1:wx2]
+        best = None
+        for scale in scales:
+            template, shape = self._scaled(scale * factor)
+            if template.shape[0] > region.shape[0] or template.shape[1] > region.shape[1]:
+                continue
+            if factor < 1.0 and min(template.shape) < 4:
+                continue  # Too few pixels left to mean anything
+            if self.match_mask is not None:
+                scores = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED, mask=shape)
+            else:
+                scores = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+            # Flat windows give NaN/inf instead of a score
+            scores = np.nan_to_num(scores, nan=-1.0, posinf=-1.0, neginf=-1.0)
+            _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+            if best is None or score > best[0]:
+                best = (score, wx1 + dx, wy1 + dy, scale)
+        return best
+
+    def _local_search(self, gray, seed):
+        x, y, scale = seed
+        index = min(range(len(self.scales)), key=lambda i: abs(self.scales[i] - scale))
+        scales = self.scales[max(0, index - 1):index + 2]
+        height, width = gray.shape
+        th, tw = self.template.shape[:2]
+        reach = max(scales)
+        window = (
+            max(0, x - self.search_margin),
+            max(0, y - self.search_margin),
+            min(width, x + round(tw * reach) + self.search_margin),
+            min(height, y + round(th * reach) + self.search_margin),
+        )
+        return self._search(gray, window, scales)
+
+    def _full_search(self, gray):
+        """Coarse search of the whole frame, refined at full resolution around the best hit."""
+        height, width = gray.shape
+        # Keep the template at least 8 px on its short side in the coarse pass
+        factor = min(1.0, max(self.coarse_side / max(height, width), 8 / min(self.template.shape[:2])))
+        coarse = gray if factor >= 1.0 else cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        # Every other scale; the refinement also tries the neighbouring ones
+        one = self.scales.index(1.0) if 1.0 in self.scales else 0
+        scales = self.scales[one % 2::2]
+        candidate = self._search(coarse, (0, 0, coarse.shape[1], coarse.shape[0]), scales, factor)
+        if candidate is None:
+            return None
+        _, x, y, scale = candidate
+        return self._local_search(gray, (round(x / factor), round(y / factor), scale))
+
+    def locate(self, gray):
+        """Update and return the (x, y, scale) used for this grayscale frame, or None."""
+        found = None
+        seed = self.match or self.origin
+        if seed is not None:
+            found = self._local_search(gray, seed)
+        if (found is None or found[0] < self.threshold) and self.frames >= self._next_full_search:
+            self._next_full_search = self.frames + self.rescan_interval
+            self.full_searches += 1
+            candidate = self._full_search(gray)
+            if candidate is not None and (found is None or candidate[0] > found[0]):
+                found = candidate
+        self.frames += 1
+
+        if found is not None and found[0] >= self.threshold:
+            self.located += 1
+            self.match = found[1:]
+        else:
+            self.lost += 1
+        return self.match or self.origin
+
+    def mask_for(self, frame):
+        """Full-frame binary mask with the template mask moved to its position in this BGR frame."""
+        height, width = frame.shape[:2]
+        mask = np.zeros((height, width), dtype=np.uint8)
+        if not self.active:
+            return mask
+        position = self.locate(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        if position is None:
+            return mask
+        if self._cache[0] == position and self._cache[1] == (height, width):
+            return self._cache[2]
+
+        x, y, scale = position
+        _, shape = self._scaled(scale)
+        sx1, sy1 = max(0, -x), max(0, -y)
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(width, x + shape.shape[1]), min(height, y + shape.shape[0])
+        if x2 > x1 and y2 > y1:
+            mask[y1:y2, x1:x2] = shape[sy1:sy1 + y2 - y1, sx1:sx1 + x2 - x1]
+        self._cache = (position, (height, width), mask)
+        return mask
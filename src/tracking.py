@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.lazy import lazy_module
+
+cv2 = lazy_module("cv2")
+
+
+class BBoxTracker:
+    """
+    Follow detected bboxes from frame to frame with template matching.
+
+    reset() stores a grayscale template for each bbox of a detection frame.
+    update() looks for each template in a window around its last position,
+    `search_margin` pixels larger on every side. The templates are not refreshed
+    while tracking, so the boxes cannot drift away from what Florence-2 actually
+    detected. Confidence is the worst normalized correlation over all bboxes.
+    A caller re-detects when it drops below its threshold.
+    """
+
+    def __init__(self, search_margin=32):
+        self.search_margin = search_margin
+        self.templates = []
+        self.bboxes = []
+
+    @property
+    def active(self):
+        return bool(self.bboxes)
+
+    def reset(self, gray_frame, bboxes):
+        height, width = gray_frame.shape[:2]
+        self.templates = []
+        self.bboxes = []
+        for x1, y1, x2, y2 in bboxes:
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            self.templates.append(gray_frame[y1:y2, x1:x2].copy())
+            self.bboxes.append([x1, y1, x2, y2])
+
+    def update(self, gray_frame):
+        """Return (bboxes, confidence) for the new frame."""
+        if not self.bboxes:
+            return [], 0.0
+
+        height, width = gray_frame.shape[:2]
+        confidence = 1.0
+        for i, (template, (x1, y1, x2, y2)) in enumerate(zip(self.templates, self.bboxes)):
+            th, tw = template.shape
+            sx1 = max(0, x1 - self.search_margin)
+            sy1 = max(0, y1 - self.search_margin)
+            sx2 = min(width, x2 + self.search_margin)
+            sy2 = min(height, y2 + self.search_margin)
+            window = gray_frame[sy1:sy2, sx1:sx2]
+            if window.shape[0] < th or window.shape[1] < tw:
+                return self.bboxes, 0.0
+
+            scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+            if not np.isfinite(score):
+                # Flat template and window: nothing to lock on to, but nothing moved either
+                score = 1.0 if np.array_equal(window[dy:dy + th, dx:dx + tw], template) else 0.0
+            confidence = min(confidence, score)
+            self.bboxes[i] = [sx1 + dx, sy1 + dy, sx1 + dx + tw, sy1 + dy + th]
+
+        return [list(bbox) for bbox in self.bboxes], confidence
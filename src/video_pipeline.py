@@ -0,0 +1,122 @@
+import queue
+import threading
+
+# Marks the end of the stream on every queue
+_END = object()
+# How often blocked threads wake up to check whether another stage failed
+_POLL_SECONDS = 0.1
+
+
+class PipelineStage:
+    """
+    One processing stage of a frame pipeline.
+
+    `fn` receives a list of up to `batch_size` items and returns the processed
+    items in the same order. Each stage runs on exactly one thread and all queues
+    are FIFO, so frame order is preserved end to end without a reorder buffer.
+    """
+
+    def __init__(self, name, fn, batch_size=1):
+        self.name = name
+        self.fn = fn
+        self.batch_size = max(1, batch_size)
+
+
+class FramePipeline:
+    """
+    decode thread -> stage threads -> encode (caller's thread), joined by bounded queues.
+
+    At most `queue_depth` items wait between two stages, so memory stays capped
+    no matter how far the decoder could run ahead. If any thread raises, every
+    other thread stops and the exception is re-raised from run().
+    """
+
+    def __init__(self, source, stages, sink, queue_depth=8):
+        self.source = source
+        self.stages = stages
+        self.sink = sink
+        self.queues = [queue.Queue(maxsize=max(1, queue_depth)) for _ in range(len(stages) + 1)]
+        self._stop = threading.Event()
+        self._errors = []
+
+    def queue_depths(self):
+        """Current number of items waiting in front of each stage and the encoder."""
+        names = [stage.name for stage in self.stages] + ["encode"]
+        return {name: q.qsize() for name, q in zip(names, self.queues)}
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def _decode(self):
+        try:
+            for item in self.source:
+                if not self._put(self.queues[0], item):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(self.queues[0], _END)
+
+    def _work(self, stage, q_in, q_out):
+        try:
+            finished = False
+            while not finished:
+                item = self._get(q_in)
+                if item is _END:
+                    break
+                batch = [item]
+                while len(batch) < stage.batch_size:
+                    item = self._get(q_in)
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+                for result in stage.fn(batch):
+                    if not self._put(q_out, result):
+                        return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(q_out, _END)
+
+    def run(self):
+        threads = [threading.Thread(target=self._decode, name="pipeline-decode", daemon=True)]
+        for stage, q_in, q_out in zip(self.stages, self.queues, self.queues[1:]):
+            threads.append(threading.Thread(target=self._work, args=(stage, q_in, q_out), name=f"pipeline-{stage.name}", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(self.queues[-1])
+                if item is _END:
+                    break
+                self.sink(item)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if self._errors:
+                self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
@@ -2,7 +2,24 @@ import sys
 import cv2
 import numpy as np
 import os
+import shutil
 import subprocess
+import tempfile
+
+# Launched directly as src/worker.py during development: make the 'src' package importable
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.metrics import metrics, METRICS_FILE_ENV
+from src.profiling import stage_timer
+from src.template_locator import TemplateLocator
+from src.video_pipeline import FramePipeline, PipelineStage
+
+# Optional flag after the positional arguments: also write every original and unmasked frame as JPEG
+DUMP_FRAMES_FLAG = "--dump-frames"
+# Optional flag: use the mask where it is instead of locating the watermark in every frame
+FIXED_MASK_FLAG = "--fixed-mask"
 
 
 def is_video_file(path):
@@ -15,29 +32,51 @@ def is_image_file(path):
     return path.lower().endswith(image_extensions)
 
 
-def remove_watermark_from_image_using_template(image_path, mask_path, inpaint_radius=3):
-    img = cv2.imread(image_path)
-    if img is None:
-        print(f"Error: Could not load image from {image_path}")
-        return
+def load_template(mask_path):
+    """
+    Read a mask PNG once.
 
+    Returns (mask, appearance, has_alpha): the PNG thresholded to a binary uint8
+    mask, its grayscale pixels (what the watermark looks like, for
+    TemplateLocator) and whether the mask came from an alpha channel.
+    (None, None, False) if the file is unreadable.
+    """
     mask_with_alpha = cv2.imread(mask_path, cv2.IMREAD_UNCHANGED)
     if mask_with_alpha is None:
         print(f"Error: Could not load mask from {mask_path}")
-        return
+        return None, None, False
 
-    if mask_with_alpha.shape[2] == 4:  # Check for alpha channel
+    has_alpha = mask_with_alpha.ndim == 3 and mask_with_alpha.shape[2] == 4
+    if has_alpha:  # Check for alpha channel
         # Use the alpha channel as the mask
         _, mask = cv2.threshold(mask_with_alpha[:, :, 3], 1, 255, cv2.THRESH_BINARY)
+        appearance = cv2.cvtColor(mask_with_alpha, cv2.COLOR_BGRA2GRAY)
     else:
         # Fallback to grayscale if no alpha channel
-        mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
-        _, mask = cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY)
+        if mask_with_alpha.ndim == 3:
+            mask_with_alpha = cv2.cvtColor(mask_with_alpha, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(mask_with_alpha, 127, 255, cv2.THRESH_BINARY)
+        appearance = mask_with_alpha
+    return mask, appearance, has_alpha
 
-    # Using Telea's method (cv2.INPAINT_TELEA) for potentially better speed
-    result = cv2.inpaint(img, mask, inpaint_radius, cv2.INPAINT_TELEA)
 
-    return result
+def load_template_mask(mask_path):
+    """Read a mask PNG once and threshold it to a binary uint8 mask (None if unreadable)."""
+    return load_template(mask_path)[0]
+
+
+def template_locator(mask_path, frame_size):
+    """TemplateLocator for the mask PNG on frames of (height, width) `frame_size`; None if unreadable."""
+    mask, appearance, has_alpha = load_template(mask_path)
+    if mask is None:
+        return None
+    return TemplateLocator(mask, appearance, masked=has_alpha, frame_size=frame_size)
+
+
+def remove_watermark_with_mask(img, mask, inpaint_radius=3):
+    """Inpaint an in-memory BGR image with an already thresholded mask."""
+    # Using Telea's method (cv2.INPAINT_TELEA) for potentially better speed
+    return cv2.inpaint(img, mask, inpaint_radius, cv2.INPAINT_TELEA)
 
 
 def main():
@@ -46,6 +85,10 @@ def main():
     """
     print("Worker process started.")
 
+    # The GUI reads progress from this JSON-lines file instead of parsing stdout
+    if os.environ.get(METRICS_FILE_ENV):
+        metrics.open(os.environ[METRICS_FILE_ENV])
+
     if len(sys.argv) < 4:
         print(
             "Error: Missing arguments. Expected: watermark_template_path, watermark_mask_applied_path, media_to_be_edited_path"
@@ -63,6 +106,9 @@ def main():
         f"Watermark mask (image to be applied) path (ignored): {watermark_mask_applied_path}"
     )
     print(f"Media to be edited path: {media_to_be_edited_path}")
+    dump_frames = DUMP_FRAMES_FLAG in sys.argv[4:]
+    fixed_mask = FIXED_MASK_FLAG in sys.argv[4:]
+    metrics.start(input=media_to_be_edited_path, mask=watermark_template_path)
 
     try:
         if media_to_be_edited_path and os.path.exists(media_to_be_edited_path):
@@ -83,7 +129,20 @@ def main():
                 total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
                 print(f"DEBUG: Video total frames: {total_frames}")
 
-                # Create subfolders for frames
+                # The mask is read and thresholded once, not per frame
+                locator = None
+                if fixed_mask:
+                    mask = load_template_mask(watermark_template_path)
+                    if mask is None:
+                        sys.exit(1)
+                else:
+                    locator = template_locator(
+                        watermark_template_path, (frame_height, frame_width)
+                    )
+                    if locator is None:
+                        sys.exit(1)
+
+                # Frame dumps are only written on request (--dump-frames)
                 video_basename = os.path.splitext(
                     os.path.basename(media_to_be_edited_path)
                 )[0]
@@ -92,11 +151,11 @@ def main():
                 )
                 original_frames_dir = os.path.join(output_frames_dir, "original_frames")
                 unmasked_frames_dir = os.path.join(output_frames_dir, "unmasked_frames")
-
-                os.makedirs(original_frames_dir, exist_ok=True)
-                os.makedirs(unmasked_frames_dir, exist_ok=True)
-                print(f"DEBUG: Original frames will be saved to: {original_frames_dir}")
-                print(f"DEBUG: Unmasked frames will be saved to: {unmasked_frames_dir}")
+                if dump_frames:
+                    os.makedirs(original_frames_dir, exist_ok=True)
+                    os.makedirs(unmasked_frames_dir, exist_ok=True)
+                    print(f"DEBUG: Original frames will be saved to: {original_frames_dir}")
+                    print(f"DEBUG: Unmasked frames will be saved to: {unmasked_frames_dir}")
 
                 print("STAGE: Extracting frames and preparing for unmasking...")
 
@@ -106,46 +165,94 @@ def main():
                     output_video_path, fourcc, fps, (frame_width, frame_height)
                 )
                 print("STAGE: Unmasking video frames...")
+                metrics.stage("Unmasking video frames")
+
+                def decode_frames():
+                    while True:
+                        with stage_timer.stage("decode"):
+                            ret, frame = cap.read()
+                        if not ret:
+                            break
+                        yield frame
+
+                def locate_stage(frames):
+                    # Each search is seeded by the previous frame's match, so this stays one ordered stage
+                    with stage_timer.stage("locate"):
+                        return [
+                            (frame, locator.mask_for(frame) if locator else mask)
+                            for frame in frames
+                        ]
+
+                def inpaint_stage(items):
+                    # cv2.inpaint releases the GIL, so this overlaps with decoding and encoding
+                    with stage_timer.stage("inpaint"):
+                        return [
+                            (frame, remove_watermark_with_mask(frame, frame_mask))
+                            for frame, frame_mask in items
+                        ]
 
                 unmasked_frames = 0
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-
-                    # Save original frame
-                    original_frame_path = os.path.join(
-                        original_frames_dir, f"frame_{unmasked_frames:05d}.jpg"
-                    )
-                    cv2.imwrite(original_frame_path, frame)
 
-                    unmasked_frame = remove_watermark_from_image_using_template(
-                        original_frame_path, watermark_template_path
-                    )  # , threshold=tolerance/100.0)
-                    if unmasked_frame is not None:
+                def encode_frame(item):
+                    nonlocal unmasked_frames
+                    frame, unmasked_frame = item
+                    with stage_timer.stage("encode"):
                         out.write(unmasked_frame)
-                        # Save unmasked frame
-                        unmasked_frame_path = os.path.join(
-                            unmasked_frames_dir, f"frame_{unmasked_frames:05d}.jpg"
+                    if dump_frames:
+                        cv2.imwrite(
+                            os.path.join(
+                                original_frames_dir, f"frame_{unmasked_frames:05d}.jpg"
+                            ),
+                            frame,
+                        )
+                        cv2.imwrite(
+                            os.path.join(
+                                unmasked_frames_dir, f"frame_{unmasked_frames:05d}.jpg"
+                            ),
+                            unmasked_frame,
                         )
-                        cv2.imwrite(unmasked_frame_path, unmasked_frame)
 
                     unmasked_frames += 1
                     if total_frames > 0:
                         progress = int((unmasked_frames / total_frames) * 100)
                         print(f"PROGRESS:{progress}")
                         sys.stdout.flush()
+                        metrics.progress(
+                            "video",
+                            unmasked_frames,
+                            total_frames,
+                            percent=progress,
+                            queue_depths=pipeline.queue_depths(),
+                        )
 
-                cap.release()
-                out.release()
+                pipeline = FramePipeline(
+                    decode_frames(),
+                    [
+                        PipelineStage("locate", locate_stage),
+                        PipelineStage("inpaint", inpaint_stage),
+                    ],
+                    encode_frame,
+                )
+                try:
+                    pipeline.run()
+                finally:
+                    cap.release()
+                    out.release()
+                if locator is not None and locator.active:
+                    print(
+                        f"DEBUG: Watermark located in {locator.located} of {locator.located + locator.lost} frames "
+                        f"({locator.full_searches} full-frame searches)"
+                    )
 
                 # --- Audio Merging Logic ---
                 print("STAGE: Handling audio for the final video...")
+                metrics.stage("Handling audio for the final video")
                 temp_video_path = output_video_path  # The one without audio
                 final_video_path_with_audio = temp_video_path.replace(
                     "_unmasked.", "_unmasked_with_audio."
                 )
-                audio_path = os.path.join(output_frames_dir, "extracted_audio.aac")
+                audio_dir = output_frames_dir if dump_frames else tempfile.mkdtemp()
+                audio_path = os.path.join(audio_dir, "extracted_audio.aac")
 
                 try:
                     # 1. Extract audio from original video
@@ -161,7 +268,8 @@ def main():
                         audio_path,
                     ]
                     print("DEBUG: Running ffmpeg to extract audio...")
-                    subprocess.run(extract_command, check=True, capture_output=True)
+                    with stage_timer.stage("mux"):
+                        subprocess.run(extract_command, check=True, capture_output=True)
 
                     # 2. Combine unmasked video with extracted audio
                     print("STAGE: Combining video and audio...")
@@ -181,7 +289,8 @@ def main():
                         final_video_path_with_audio,
                     ]
                     print("DEBUG: Running ffmpeg to combine video and audio...")
-                    subprocess.run(combine_command, check=True, capture_output=True)
+                    with stage_timer.stage("mux"):
+                        subprocess.run(combine_command, check=True, capture_output=True)
 
                     # 3. Success: cleanup and rename
                     os.remove(temp_video_path)
@@ -200,10 +309,14 @@ def main():
                     if os.path.exists(audio_path):
                         os.remove(audio_path)
                     # The output_video_path is already the silent one, so we are good.
+                finally:
+                    if not dump_frames:
+                        shutil.rmtree(audio_dir, ignore_errors=True)
 
                 print(f"Unmasked video saved to: {output_video_path}")
                 print("PROGRESS:100")
                 sys.stdout.flush()
+                metrics.file_done(media_to_be_edited_path, output_video_path)
 
             elif is_image_file(media_to_be_edited_path):
                 print(
@@ -216,16 +329,25 @@ def main():
                     )
                     sys.exit(1)
 
-                unmasked_img = remove_watermark_from_image_using_template(
-                    img, watermark_template_path
-                )  # , threshold=tolerance/100.0)
+                if fixed_mask:
+                    mask = load_template_mask(watermark_template_path)
+                else:
+                    locator = template_locator(watermark_template_path, img.shape[:2])
+                    with stage_timer.stage("locate"):
+                        mask = locator.mask_for(img) if locator else None
+                if mask is None:
+                    sys.exit(1)
+                with stage_timer.stage("inpaint"):
+                    unmasked_img = remove_watermark_with_mask(img, mask)
                 if unmasked_img is not None:
                     output_path = media_to_be_edited_path.replace(".", "_unmasked.")
                     cv2.imwrite(output_path, unmasked_img)
                     print(f"Unmasked image saved to: {output_path}")
+                    metrics.file_done(media_to_be_edited_path, output_path)
                 print("STAGE: Image processing complete.")
                 print("PROGRESS:100")
                 sys.stdout.flush()
+                metrics.progress("image", 1, 1, percent=100)
             else:
                 print(
                     "Error: Provided path is neither a valid image nor a valid video file."
@@ -239,10 +361,12 @@ def main():
 
     except Exception as e:
         print(f"An error occurred during processing: {e}")
+        metrics.finish(status="error", error=str(e))
         sys.exit(1)
 
     print("Worker process finished successfully.")
     sys.stdout.flush()
+    metrics.finish()
 
 
 if __name__ == "__main__":
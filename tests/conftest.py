@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run from anywhere: make the 'src' package and the main script importable
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
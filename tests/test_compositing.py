@@ -0,0 +1,59 @@
+import numpy as np
+from PIL import Image
+
+from remwm_lama_florence2 import make_region_transparent
+from src.compositing import fill_masked_region, make_transparent_rgba
+
+
+def _old_transparent(image, mask):
+    """The per-pixel loop make_region_transparent() used before compositing was vectorized."""
+    image = image.convert("RGBA")
+    mask = mask.convert("L")
+    transparent_image = Image.new("RGBA", image.size)
+    for x in range(image.width):
+        for y in range(image.height):
+            if mask.getpixel((x, y)) > 0:
+                transparent_image.putpixel((x, y), (0, 0, 0, 0))
+            else:
+                transparent_image.putpixel((x, y), image.getpixel((x, y)))
+    return transparent_image
+
+
+def _old_flattened(image, mask):
+    """The old video path: the transparent result pasted onto white."""
+    result_image = _old_transparent(image, mask)
+    background = Image.new("RGB", result_image.size, (255, 255, 255))
+    background.paste(result_image, mask=result_image.split()[3])
+    return background
+
+
+def _sample():
+    rng = np.random.default_rng(1)
+    pixels = rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    mask = np.zeros((24, 32), np.uint8)
+    mask[4:10, 6:20] = 255
+    mask[15:22, 25:31] = 1  # any non-zero value counts as masked
+    return Image.fromarray(pixels), Image.fromarray(mask, mode="L")
+
+
+def test_transparent_matches_old_loop():
+    image, mask = _sample()
+    np.testing.assert_array_equal(np.array(make_region_transparent(image, mask)), np.array(_old_transparent(image, mask)))
+
+
+def test_filled_frame_matches_old_flattening():
+    image, mask = _sample()
+    expected = np.array(_old_flattened(image, mask))
+    np.testing.assert_array_equal(fill_masked_region(np.array(image), np.array(mask)), expected)
+    # Also in BGR, as the video paths call it, and with an HxWx1 mask
+    bgr = fill_masked_region(np.array(image)[:, :, ::-1], np.array(mask)[:, :, None])
+    np.testing.assert_array_equal(bgr, expected[:, :, ::-1])
+
+
+def test_inputs_are_not_modified():
+    image, mask = _sample()
+    frame = np.array(image)
+    before = frame.copy()
+    make_transparent_rgba(frame, np.array(mask))
+    fill_masked_region(frame, np.array(mask))
+    np.testing.assert_array_equal(frame, before)
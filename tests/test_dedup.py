@@ -0,0 +1,31 @@
+import numpy as np
+
+from remwm_lama_florence2 import is_duplicate_masked_frame
+from src.dedup import FrameDeduplicator
+
+
+def test_static_frames_are_duplicates():
+    dedup = FrameDeduplicator()
+    frame = np.full((64, 64, 3), 100, np.uint8)
+    assert [dedup.is_duplicate(frame) for _ in range(4)] == [False, True, True, True]
+    assert dedup.hit_rate == 0.75
+
+
+def test_frame_without_bboxes_ends_the_run():
+    # Static clip with one missed detection at frame 10: that frame is written
+    # unmasked, so frame 11 must be inpainted again instead of reusing the output
+    # of the last frame, which is the unmasked frame 10
+    dedup = FrameDeduplicator()
+    frame = np.full((64, 64, 3), 100, np.uint8)
+    duplicates = [
+        is_duplicate_masked_frame(dedup, frame, [] if i == 10 else [(8, 8, 24, 24)])
+        for i in range(20)
+    ]
+    assert duplicates[:10] == [False] + [True] * 9
+    assert duplicates[10:12] == [False, False]
+    assert all(duplicates[12:])
+
+
+def test_no_dedup():
+    frame = np.zeros((16, 16, 3), np.uint8)
+    assert not is_duplicate_masked_frame(None, frame, [(0, 0, 4, 4)])
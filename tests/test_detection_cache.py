@@ -0,0 +1,66 @@
+import os
+import time
+
+import numpy as np
+
+from src.detection_cache import DetectionCache
+
+
+def _entry_size(cache, key):
+    return os.path.getsize(cache._path(key))
+
+
+def test_key_depends_on_pixels_prompt_and_model(tmp_path):
+    cache = DetectionCache(tmp_path)
+    image = np.zeros((8, 8, 3), np.uint8)
+    other = image.copy()
+    other[0, 0, 0] = 1
+
+    key = cache.key(image, "watermark", "florence")
+    assert cache.key(image.copy(), "watermark", "florence") == key
+    assert cache.key(other, "watermark", "florence") != key
+    assert cache.key(image, "logo", "florence") != key
+    assert cache.key(image, "watermark", "other-model") != key
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = DetectionCache(tmp_path)
+    assert cache.get("ab" * 20) is None
+    cache.put("ab" * 20, [[1, 2, 3, 4]])
+    assert cache.get("ab" * 20) == [[1, 2, 3, 4]]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A new instance finds the same entry on disk
+    assert DetectionCache(tmp_path).get("ab" * 20) == [[1, 2, 3, 4]]
+
+
+def test_overwrite_does_not_grow_size(tmp_path):
+    cache = DetectionCache(tmp_path)
+    key = "cd" * 20
+    cache.put(key, [[1, 2, 3, 4]])
+    for _ in range(5):
+        cache.put(key, [[5, 6, 7, 8]])
+    assert cache._size == _entry_size(cache, key)
+    assert cache._size == DetectionCache(tmp_path)._size
+
+
+def test_evicts_least_recently_used(tmp_path):
+    probe = DetectionCache(tmp_path / "probe")
+    probe.put("00" * 20, [[0, 0, 10, 10]])
+    entry = _entry_size(probe, "00" * 20)
+
+    # Room for three entries; the fourth trims back to 90% of the budget
+    cache = DetectionCache(tmp_path / "cache", max_bytes=entry * 3)
+    keys = [f"{i:02d}" * 20 for i in range(1, 5)]
+    now = time.time()
+    for age, key in enumerate(keys[:3]):
+        cache.put(key, [[0, 0, 10, 10]])
+        os.utime(cache._path(key), (now - 100 + age, now - 100 + age))
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[3], [[0, 0, 10, 10]])
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache._size <= cache.max_bytes * 0.9
@@ -0,0 +1,56 @@
+from PIL import Image
+
+from src.detection_frontend import DetectionFrontEnd, merge_bboxes, tile_windows
+
+
+def test_tiles_cover_the_image_with_overlap():
+    windows = tile_windows(3000, 2000, 2, 0.2)
+    assert windows == [(0, 0, 1667, 1112), (1333, 0, 3000, 1112), (0, 888, 1667, 2000), (1333, 888, 3000, 2000)]
+    # Neighbours share at least 20% of the tile size
+    assert 1667 - 1333 >= 0.2 * 1667
+    assert 1112 - 888 >= 0.2 * 1112
+
+
+def test_merge_folds_overlapping_and_contained_boxes():
+    merged = merge_bboxes([
+        [100, 100, 200, 150],
+        [105, 102, 205, 152],   # same watermark seen by another view: IoU above 0.5
+        [300, 300, 400, 400],
+        [375, 310, 405, 390],   # cut at a tile seam: mostly inside the previous box
+        [320, 320, 360, 360],   # fully inside
+        [900, 900, 950, 950],   # unrelated
+    ])
+    assert sorted(merged) == [[100, 100, 205, 152], [300, 300, 405, 400], [900, 900, 950, 950]]
+
+
+def test_merge_keeps_separate_boxes():
+    boxes = [[0, 0, 10, 10], [20, 0, 30, 10], [5, 5, 25, 8]]
+    assert len(merge_bboxes(boxes)) == 3
+
+
+def test_downscaled_view_maps_back_to_original_coordinates():
+    frontend = DetectionFrontEnd(max_side=1000)
+    image = Image.new("RGB", (4000, 2000))
+    views = frontend.views(image)
+    assert [(view.size, transform) for view, transform in views] == [((1000, 500), (0, 0, 0.25))]
+
+    bboxes = frontend.merge([[[10, 20, 30, 40]]], [transform for _, transform in views], image.size)
+    assert bboxes == [[40, 80, 120, 160]]
+
+
+def test_tiled_views_are_merged_across_the_seam():
+    frontend = DetectionFrontEnd(tiles=2, overlap=0.2)
+    image = Image.new("RGB", (3000, 2000))
+    views = frontend.views(image)
+    transforms = [transform for _, transform in views]
+    assert transforms == [(0, 0, 1.0), (0, 0, 1.0), (1333, 0, 1.0), (0, 888, 1.0), (1333, 888, 1.0)]
+
+    # A logo at (1400, 100)-(1600, 200) seen by the whole image and both top tiles
+    view_bboxes = [[[1400, 100, 1600, 200]], [[1400, 100, 1600, 200]], [[67, 100, 267, 200]], [], []]
+    assert frontend.merge(view_bboxes, transforms, image.size) == [[1400, 100, 1600, 200]]
+
+
+def test_small_images_are_left_alone():
+    frontend = DetectionFrontEnd(max_side=1000, tiles=3)
+    image = Image.new("RGB", (800, 600))
+    assert [(view.size, transform) for view, transform in frontend.views(image)] == [((800, 600), (0, 0, 1.0))]
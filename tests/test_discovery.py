@@ -0,0 +1,43 @@
+from src.discovery import DirectoryScan, iter_files
+
+
+def _is_image(name):
+    return name.endswith(".png")
+
+
+def _tree(root):
+    for relative in ["b.png", "a.png", "notes.txt", "sub/z.png", "sub/deeper/y.png", "other/x.png", "out/old.png"]:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+
+def test_recursive_in_stable_order(tmp_path):
+    # Files of a folder come before its subfolders, both in name order
+    _tree(tmp_path)
+    found = [path.relative_to(tmp_path).as_posix() for path in iter_files(tmp_path, _is_image)]
+    assert found == ["a.png", "b.png", "other/x.png", "out/old.png", "sub/z.png", "sub/deeper/y.png"]
+
+
+def test_output_folder_is_not_entered(tmp_path):
+    _tree(tmp_path)
+    found = [path.relative_to(tmp_path).as_posix() for path in iter_files(tmp_path, _is_image, exclude=tmp_path / "out")]
+    assert "out/old.png" not in found
+    assert len(found) == 5
+
+
+def test_scan_mirrors_layout_under_output(tmp_path):
+    source = tmp_path / "in"
+    _tree(source)
+    scan = DirectoryScan(source, _is_image, exclude=source / "out")
+    mirrored = [(tmp_path / "result" / path.relative_to(source)).relative_to(tmp_path).as_posix() for path in scan]
+
+    assert mirrored == ["result/a.png", "result/b.png", "result/other/x.png", "result/sub/z.png", "result/sub/deeper/y.png"]
+    assert scan.finished
+    assert scan.found == 5
+
+
+def test_scan_of_missing_folder_ends(tmp_path):
+    scan = DirectoryScan(tmp_path / "missing", _is_image)
+    assert list(scan) == []
+    assert scan.finished and scan.found == 0
@@ -0,0 +1,21 @@
+import pickle
+
+import numpy as np
+
+from src.hd_strategy import LamaConfig
+
+
+def test_survives_pickling_for_worker_processes():
+    config = LamaConfig("auto", crop_margin=32)
+    copy = pickle.loads(pickle.dumps(config))
+    assert repr(copy) == repr(config)
+    assert copy.select(np.zeros((600, 600, 3), np.uint8), np.zeros((600, 600), np.uint8)) == "original"
+
+
+def test_auto_crops_small_masks_on_large_images():
+    image = np.zeros((1080, 1920, 3), np.uint8)
+    mask = np.zeros((1080, 1920), np.uint8)
+    mask[1000:1040, 1700:1880] = 255
+    assert LamaConfig("auto").select(image, mask) == "crop"
+    mask[:] = 255
+    assert LamaConfig("auto").select(image, mask) == "resize"
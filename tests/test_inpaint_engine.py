@@ -0,0 +1,55 @@
+import pickle
+
+import numpy as np
+
+from remwm_lama_florence2 import add_counters, take_counters
+from src.detection_cache import DetectionCache
+from src.hd_strategy import LamaConfig
+from src.inpaint_engine import InpaintEngine
+
+
+def _flat_image_with_mark():
+    image = np.full((200, 300, 3), 120, np.uint8)
+    mask = np.zeros((200, 300), np.uint8)
+    mask[150:170, 200:280] = 255
+    return image, mask
+
+
+def test_auto_sends_small_marks_on_flat_background_to_telea():
+    image, mask = _flat_image_with_mark()
+    engine = InpaintEngine("auto")
+    lama_mask, classical = engine.split(image, mask)
+    assert not lama_mask.any()
+    assert (classical["telea"] == mask).all()
+    assert engine.counts == {"telea": 1}
+
+
+def test_survives_pickling_for_worker_processes():
+    engine = InpaintEngine("ns", radius=5)
+    copy = pickle.loads(pickle.dumps(engine))
+    assert repr(copy) == repr(engine)
+    image, mask = _flat_image_with_mark()
+    copy.split(image, mask)
+    assert copy.counts == {"ns": 1}
+
+
+def test_worker_counters_add_up_in_the_parent(tmp_path):
+    parent = {
+        "detection_cache": DetectionCache(tmp_path),
+        "inpaint_engine": InpaintEngine("auto"),
+        "lama_config": LamaConfig("auto"),
+    }
+    worker = pickle.loads(pickle.dumps(parent))
+    image, mask = _flat_image_with_mark()
+    for _ in range(2):
+        worker["inpaint_engine"].split(image, mask)
+        # request() needs iopaint; count the strategy it would have picked instead
+        strategy = worker["lama_config"].select(image, mask)
+        worker["lama_config"].counts[strategy] = worker["lama_config"].counts.get(strategy, 0) + 1
+        worker["detection_cache"].get("missing")
+        add_counters(parent, take_counters(worker))
+
+    assert parent["inpaint_engine"].counts == {"telea": 2}
+    assert parent["lama_config"].counts == {"original": 2}
+    assert (parent["detection_cache"].hits, parent["detection_cache"].misses) == (0, 2)
+    assert take_counters(worker) == {"detection_cache": (0, 0), "inpaint_engine": {}, "lama_config": {}}
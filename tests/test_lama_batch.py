@@ -0,0 +1,61 @@
+import numpy as np
+
+from remwm_lama_florence2 import inpaint_frames_with_lama
+from src.hd_strategy import LamaConfig
+from src.lama_batch import LamaBatcher
+
+
+class _Network:
+    """Batcher forward stand-in: paints every pixel white and records the batch shapes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images, masks):
+        self.batches.append(images.shape)
+        return np.full_like(images, 255)
+
+
+def _batcher(batch_size):
+    batcher = LamaBatcher(None, batch_size)
+    network = _Network()
+    batcher.network = (network, "cpu")
+    batcher._forward = network
+    return batcher, network
+
+
+def _frames(count, size=(1080, 1920)):
+    frames, masks = [], []
+    for i in range(count):
+        frames.append(np.full((*size, 3), 40 + i, np.uint8))
+        mask = np.zeros(size, np.uint8)
+        mask[1000:1040, 1700:1880] = 255
+        masks.append(mask)
+    return frames, masks
+
+
+def test_same_size_crops_share_forward_passes():
+    batcher, network = _batcher(4)
+    crops = [(np.zeros((h, 50, 3), np.uint8), np.full((h, 50), 255, np.uint8)) for h in (40, 40, 70, 40, 40, 40)]
+    results = batcher.inpaint(crops)
+    assert [r.shape[:2] for r in results] == [(40, 50)] * 2 + [(70, 50)] + [(40, 50)] * 3
+    # 40 px crops pad to one 64 x 64 bucket (two chunks of up to 4), the 70 px crop to 96 x 64
+    assert sorted(network.batches) == sorted([(4, 64, 64, 3), (1, 64, 64, 3), (1, 96, 64, 3)])
+    assert batcher.forward_calls == 3
+
+
+def test_only_masked_pixels_are_replaced():
+    batcher, _ = _batcher(8)
+    frames, masks = _frames(3)
+    results = inpaint_frames_with_lama(frames, masks, None, batcher=batcher)
+    for frame, mask, result in zip(frames, masks, results):
+        assert (result[mask > 0] == 255).all()
+        assert (result[mask == 0] == frame[mask == 0]).all()
+
+
+def test_batched_frames_count_their_hd_strategy():
+    batcher, _ = _batcher(8)
+    config = LamaConfig("auto")
+    frames, masks = _frames(5)
+    inpaint_frames_with_lama(frames, masks, None, lama_config=config, batcher=batcher)
+    assert config.counts == {"crop": 5}
@@ -0,0 +1,67 @@
+import os
+
+from src.manifest import Manifest
+
+
+def _build(tmp_path, params=None):
+    """One input under in/, its output under out/, recorded in a saved manifest."""
+    source = tmp_path / "in" / "sub" / "a.png"
+    source.parent.mkdir(parents=True, exist_ok=True)
+    if not source.exists():
+        source.write_bytes(b"original")
+    output = tmp_path / "out" / "sub" / "a.png"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(b"result")
+
+    manifest = Manifest(tmp_path / "out", tmp_path / "in", params or {"max_bbox_percent": 10.0})
+    manifest.record(source, output)
+    manifest.save()
+    return source, output
+
+
+def _reload(tmp_path, params=None):
+    return Manifest(tmp_path / "out", tmp_path / "in", params or {"max_bbox_percent": 10.0})
+
+
+def test_unchanged_input_is_skipped(tmp_path):
+    source, _ = _build(tmp_path)
+    manifest = _reload(tmp_path)
+    assert manifest.is_current(source)
+    assert manifest.skipped == 1
+    assert list(manifest.entries) == ["sub/a.png"]
+
+
+def test_changed_content_is_rebuilt(tmp_path):
+    source, _ = _build(tmp_path)
+    source.write_bytes(b"modified")
+    assert not _reload(tmp_path).is_current(source)
+
+
+def test_touched_input_with_same_content_is_skipped(tmp_path):
+    source, _ = _build(tmp_path)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    manifest = _reload(tmp_path)
+    assert manifest.is_current(source)
+    assert manifest.entries["sub/a.png"]["mtime_ns"] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_changed_params_invalidate(tmp_path):
+    source, _ = _build(tmp_path, {"max_bbox_percent": 10.0, "transparent": False})
+    # Key order does not matter, values do
+    assert _reload(tmp_path, {"transparent": False, "max_bbox_percent": 10.0}).is_current(source)
+    assert not _reload(tmp_path, {"transparent": False, "max_bbox_percent": 20.0}).is_current(source)
+
+
+def test_missing_output_is_rebuilt(tmp_path):
+    source, output = _build(tmp_path)
+    output.unlink()
+    assert not _reload(tmp_path).is_current(source)
+
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    source, _ = _build(tmp_path)
+    (tmp_path / "out" / ".remwm-manifest.json").write_text("{not json")
+    manifest = _reload(tmp_path)
+    assert manifest.entries == {}
+    assert not manifest.is_current(source)
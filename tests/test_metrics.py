@@ -0,0 +1,65 @@
+import io
+import json
+
+from src.metrics import MetricsEmitter
+
+
+def _events(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_job_events_are_json_lines(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    emitter = MetricsEmitter(interval=0)
+    emitter.open(str(path))
+    emitter.start(input="in.mp4", output="out.mp4")
+    emitter.stage("detect")
+    emitter.progress("video", 5, 10, queue_depths={"detect": 2})
+    emitter.file_done("in.mp4", "out.mp4")
+    emitter.finish()
+    emitter.close()
+
+    events = _events(path)
+    assert [event["event"] for event in events] == ["start", "stage", "progress", "file_done", "end"]
+    assert all(isinstance(event["time"], float) for event in events)
+    assert events[0]["input"] == "in.mp4" and isinstance(events[0]["pid"], int)
+    assert events[1]["name"] == "detect"
+
+    progress = events[2]
+    assert (progress["scope"], progress["done"], progress["total"], progress["percent"]) == ("video", 5, 10, 50.0)
+    assert progress["queue_depths"] == {"detect": 2}
+    for key in ("fps", "eta_seconds", "stages", "peak_rss_bytes"):
+        assert key in progress
+
+    assert events[3] == {"event": "file_done", "time": events[3]["time"], "input": "in.mp4", "output": "out.mp4"}
+    assert events[4]["status"] == "ok" and events[4]["seconds"] >= 0
+
+
+def test_progress_is_rate_limited_but_final_event_is_kept(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    emitter = MetricsEmitter(interval=3600)
+    emitter.open(str(path))
+    for done in range(1, 101):
+        emitter.progress("files", done, 100)
+    emitter.close()
+
+    assert [event["done"] for event in _events(path)] == [1, 100]
+
+
+def test_disabled_emitter_writes_nothing():
+    emitter = MetricsEmitter()
+    assert not emitter.enabled
+    emitter.start()
+    emitter.progress("video", 1, 2)
+    emitter.finish(status="error", error="boom")
+
+
+def test_forward_redirects_events():
+    emitter = MetricsEmitter()
+    stream = io.StringIO()
+    with emitter.forward(stream):
+        emitter.stage("inpaint")
+    emitter.stage("ignored")
+
+    assert [json.loads(line)["name"] for line in stream.getvalue().splitlines()] == ["inpaint"]
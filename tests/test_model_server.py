@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from src import model_server
+from src.metrics import metrics
+
+needs_unix_sockets = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets on this platform")
+
+
+def _free_tcp_address():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def start_server(monkeypatch, tmp_path):
+    # Token files go to a throwaway home directory
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    servers = []
+
+    def start(address, run_job):
+        thread = threading.Thread(target=model_server.serve, args=(address, run_job), daemon=True)
+        thread.start()
+        servers.append((address, thread))
+        for _ in range(100):
+            if model_server.send_command(address, {"command": "ping"}) is not None:
+                return address
+            time.sleep(0.05)
+        raise RuntimeError("model server did not start")
+
+    yield start
+    for address, thread in servers:
+        model_server.send_command(address, {"command": "shutdown"})
+        thread.join(5)
+
+
+def _echo_job(params):
+    print(f"processing {params['input_path']}")
+    metrics.start(input=params["input_path"])
+    metrics.finish()
+
+
+@needs_unix_sockets
+def test_job_stdout_and_metrics_are_relayed_to_the_client(start_server, tmp_path):
+    address = start_server(str(tmp_path / "server.sock"), _echo_job)
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+
+    out = io.StringIO()
+    lines = []
+    response = model_server.send_command(
+        address, {"command": "run", "params": {"input_path": "a.png"}, "metrics": True}, out=out, on_metrics=lines.append,
+    )
+
+    assert response == {"status": "ok"}
+    assert out.getvalue() == "processing a.png\n"
+    assert [json.loads(line)["event"] for line in lines] == ["start", "end"]
+    assert not metrics.enabled  # The server's own channel is restored after the job
+
+
+def test_tcp_server_requires_its_token(start_server):
+    address = start_server(_free_tcp_address(), _echo_job)
+    token_file = model_server.token_path(address)
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(token_file).st_mode) == 0o600
+
+    assert model_server.send_command(address, {"command": "run", "params": {"input_path": "a.png"}}, out=io.StringIO()) == {"status": "ok"}
+
+    # A raw connection without the token, as any other local process would make it
+    with socket.create_connection(model_server.parse_address(address)) as sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps({"command": "shutdown"}).encode("utf-8") + b"\n")
+        stream.flush()
+        assert json.loads(stream.readline())["status"] == "error"
+    assert model_server.send_command(address, {"command": "ping"}) == {"status": "ok"}
+
+
+@needs_unix_sockets
+def test_client_leaving_before_the_final_status_is_not_an_error(start_server, tmp_path, capsys):
+    address = start_server(str(tmp_path / "server.sock"), lambda params: time.sleep(0.2))
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(address)
+        sock.sendall(json.dumps({"command": "run", "params": {}}).encode("utf-8") + b"\n")
+    # Jobs run one at a time, so this answer comes after the job's handler is done
+    assert model_server.send_command(address, {"command": "ping"}) == {"status": "ok"}
+    assert "Traceback" not in capsys.readouterr().err
@@ -0,0 +1,54 @@
+import numpy as np
+
+from remwm_lama_florence2 import inpaint_with_lama
+from src.roi import mask_regions
+
+
+def _model(image, mask, config):
+    """Model manager stand-in: RGB in, BGR out, with every masked pixel painted the same colour."""
+    result = image[:, :, ::-1].copy()
+    result[mask > 0] = (200, 100, 50)
+    return result
+
+
+class _Config:
+    """LamaConfig stand-in that does not need iopaint to build a request."""
+
+    def request(self, image, mask, count=True):
+        return None
+
+
+def _frame_and_mask():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (360, 640, 3), dtype=np.uint8)
+    mask = np.zeros((360, 640), np.uint8)
+    mask[10:40, 20:120] = 255       # near the top-left edge: the padding is clipped
+    mask[300:350, 560:630] = 255    # near the bottom-right edge
+    mask[150:170, 300:320] = 255
+    mask[150:170, 340:360] = 255    # close enough to the previous one to share a window
+    return image, mask
+
+
+def test_roi_result_equals_full_frame():
+    image, mask = _frame_and_mask()
+    full = inpaint_with_lama(image, mask, _model, lama_config=_Config())
+    stats = {}
+    roi = inpaint_with_lama(image, mask, _model, roi_padding=16, stats=stats, lama_config=_Config())
+
+    np.testing.assert_array_equal(roi, full)
+    assert 0 < stats["processed_pixels"] < stats["total_pixels"] == 360 * 640
+
+
+def test_union_result_equals_full_frame():
+    image, mask = _frame_and_mask()
+    full = inpaint_with_lama(image, mask, _model, lama_config=_Config())
+    union = inpaint_with_lama(image, mask, _model, roi_padding=16, roi_union=True, lama_config=_Config())
+    np.testing.assert_array_equal(union, full)
+
+
+def test_regions_are_padded_clipped_and_merged():
+    _, mask = _frame_and_mask()
+    windows = sorted(mask_regions(mask, padding=16))
+    assert windows == [(4, 0, 136, 56), (284, 134, 376, 186), (544, 284, 640, 360)]
+    assert mask_regions(mask, padding=16, union=True) == [(4, 0, 640, 360)]
+    assert mask_regions(np.zeros((8, 8), np.uint8)) == []
@@ -0,0 +1,53 @@
+import numpy as np
+
+from src.template_locator import TemplateLocator
+
+
+def _logo():
+    logo = np.zeros((20, 50), np.uint8)
+    logo[:, :10] = 255
+    logo[:7, 10:] = 255
+    logo[13:, 25:] = 255
+    return logo
+
+
+def _background(seed, size=(360, 640)):
+    rng = np.random.default_rng(seed)
+    return rng.integers(40, 120, (*size, 3), dtype=np.uint8)
+
+
+def _frame_with_logo(logo, x, y, seed=0):
+    frame = _background(seed)
+    frame[y:y + logo.shape[0], x:x + logo.shape[1]][logo > 0] = 235
+    return frame
+
+
+def test_follows_a_moving_logo():
+    logo = _logo()
+    locator = TemplateLocator(logo, logo)
+    for i in range(10):
+        x, y = 50 + i * 10, 80 + i * 3
+        mask = locator.mask_for(_frame_with_logo(logo, x, y, seed=i))
+        assert locator.match[:2] == (x, y)
+        assert mask[y:y + 20, x:x + 50][logo > 0].all()
+    assert locator.full_searches == 1
+
+
+def test_lost_logo_is_searched_once_per_rescan_interval():
+    logo = _logo()
+    locator = TemplateLocator(logo, logo, rescan_interval=15)
+    for i in range(40):
+        mask = locator.mask_for(_background(i))
+        assert not mask.any()
+    assert locator.located == 0
+    assert locator.full_searches == 3  # frames 0, 15 and 30
+
+
+def test_frame_sized_mask_keeps_its_position_when_not_found():
+    logo = _logo()
+    frame_mask = np.zeros((360, 640), np.uint8)
+    frame_mask[300:320, 500:550] = logo
+    locator = TemplateLocator(frame_mask, frame_mask, frame_size=(360, 640), rescan_interval=10)
+    for i in range(25):
+        assert (locator.mask_for(_background(i)) == frame_mask).all()
+    assert locator.full_searches == 3
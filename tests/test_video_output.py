@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from remwm_lama_florence2 import close_video_writer, open_video_writer, partial_video_path
+from src.ffmpeg_writer import ffmpeg_available
+
+
+def _write_frames(output_file, frames=5):
+    out = open_video_writer(partial_video_path(output_file), 64, 48, 24, "MP4", None)
+    for t in range(frames):
+        out.write(np.full((48, 64, 3), t * 40, np.uint8))
+    return out
+
+
+@pytest.fixture(params=["ffmpeg", "opencv"])
+def writer_backend(request, monkeypatch):
+    if request.param == "ffmpeg" and not ffmpeg_available():
+        pytest.skip("ffmpeg is not on PATH")
+    if request.param == "opencv":
+        monkeypatch.setattr("remwm_lama_florence2.ffmpeg_available", lambda: False)
+    return request.param
+
+
+def test_completed_video_is_moved_to_the_output_path(tmp_path, writer_backend):
+    output_file = tmp_path / "clip.mp4"
+    close_video_writer(_write_frames(output_file), output_file, completed=True)
+    assert output_file.stat().st_size > 0
+    assert not partial_video_path(output_file).exists()
+
+
+def test_failed_video_leaves_no_output(tmp_path, writer_backend):
+    output_file = tmp_path / "clip.mp4"
+    close_video_writer(_write_frames(output_file), output_file, completed=False)
+    assert not output_file.exists()
+    assert not partial_video_path(output_file).exists()
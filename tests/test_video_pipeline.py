@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+
+import pytest
+
+from src.video_pipeline import FramePipeline, PipelineStage
+
+
+def _jittery(offset):
+    """Stage that adds `offset` to each item after a random short sleep."""
+    def fn(batch):
+        time.sleep(random.random() * 0.002)
+        return [item + offset for item in batch]
+    return fn
+
+
+def test_order_is_preserved_with_batches():
+    batches = []
+
+    def record(batch):
+        batches.append(len(batch))
+        return batch
+
+    results = []
+    pipeline = FramePipeline(
+        iter(range(50)),
+        [PipelineStage("detect", record, batch_size=4), PipelineStage("inpaint", _jittery(1000), batch_size=3)],
+        results.append,
+        queue_depth=2,
+    )
+    pipeline.run()
+
+    assert results == [i + 1000 for i in range(50)]
+    assert sum(batches) == 50
+    assert max(batches) <= 4
+
+
+def test_stage_error_is_raised_and_threads_stop():
+    def explode(batch):
+        if 7 in batch:
+            raise ValueError("bad frame")
+        return batch
+
+    results = []
+    before = threading.active_count()
+    pipeline = FramePipeline(iter(range(1000)), [PipelineStage("inpaint", explode)], results.append, queue_depth=2)
+    with pytest.raises(ValueError, match="bad frame"):
+        pipeline.run()
+
+    # Frames already past the failing stage may or may not reach the sink, but never out of order
+    assert results == list(range(len(results)))
+    assert len(results) <= 7
+    assert threading.active_count() == before
+
+
+def test_source_and_sink_errors_are_raised():
+    def source():
+        yield 1
+        raise OSError("decode failed")
+
+    with pytest.raises(OSError, match="decode failed"):
+        FramePipeline(source(), [PipelineStage("identity", list)], lambda item: None).run()
+
+    def sink(item):
+        raise RuntimeError("encode failed")
+
+    # The decoder would block forever on a full queue if the sink's failure did not stop it
+    with pytest.raises(RuntimeError, match="encode failed"):
+        FramePipeline(iter(range(1000)), [PipelineStage("identity", list)], sink, queue_depth=1).run()
+
+
+def test_queues_stay_bounded():
+    depths = []
+    pipeline = None
+
+    def sink(item):
+        depths.append(max(pipeline.queue_depths().values()))
+        time.sleep(0.001)
+
+    pipeline = FramePipeline(iter(range(100)), [PipelineStage("identity", list)], sink, queue_depth=3)
+    pipeline.run()
+    assert max(depths) <= 3